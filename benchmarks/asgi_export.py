@@ -0,0 +1,100 @@
+"""
+Compare WSGI and ASGI concurrency on the export endpoint:
+
+    python -m benchmarks.asgi_export [--clients 16] [--workers 2] [--rows 5000] [--json out.json]
+
+Both servers get the same number of workers: gunicorn sync workers for
+WSGI, uvicorn workers (gunicorn_asgi.conf.py) for ASGI. ``--clients``
+slow clients download the CSV export at once, reading it in small pieces
+with a pause between each, and while they do a probe client times GETs of
+the survey list. Under WSGI every slow download holds a whole worker, so
+the probe waits for one to free up; under ASGI the downloads only hold
+coroutines.
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import migrate, seed_surveys, setup_django, write_json
+from .serving import fetch, start_server
+
+SERVERS = {
+    'wsgi (sync)': ('gunicorn.conf.py', 'cqhei_project.wsgi:application', {'GUNICORNWORKERCLASS': 'sync'}),
+    'asgi (uvicorn)': ('gunicorn_asgi.conf.py', 'cqhei_project.asgi:application', {}),
+}
+
+
+def slow_download(url, read_size, pause):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=300) as response:
+        while response.read(read_size):
+            time.sleep(pause)
+    return (time.perf_counter() - started) * 1000
+
+
+def run(base, clients, read_size, pause, probes):
+    done = threading.Event()
+    probe_ms = []
+
+    def probe():
+        while not done.is_set() and len(probe_ms) < probes:
+            probe_ms.append(fetch(base + '/surveys/'))
+
+    with ThreadPoolExecutor(clients + 1) as pool:
+        started = time.perf_counter()
+        downloads = [pool.submit(slow_download, base + '/export/', read_size, pause) for _ in range(clients)]
+        time.sleep(0.1)  # let the downloads take their workers first
+        prober = pool.submit(probe)
+        download_ms = [f.result() for f in downloads]
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.result()
+
+    return {
+        'wall_s': round(elapsed, 3),
+        'download_p50_ms': round(statistics.median(download_ms), 3),
+        'probe_requests': len(probe_ms),
+        'probe_p50_ms': round(statistics.median(probe_ms), 3) if probe_ms else None,
+        'probe_max_ms': round(max(probe_ms), 3) if probe_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--read-size', type=int, default=16384)
+    parser.add_argument('--pause', type=float, default=0.01, help="Seconds between reads.")
+    parser.add_argument('--probes', type=int, default=50)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    migrate()
+    seed_surveys(args.rows)
+
+    results = {}
+    for name, (config, app, mode_env) in SERVERS.items():
+        server, base = start_server(db_path, mode_env, args.workers, config=config, app=app)
+        try:
+            results[name] = run(base, args.clients, args.read_size, args.pause, args.probes)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.clients} slow export downloads, {args.workers} workers, {args.rows} surveys\n")
+    print(f"{'server':<16}{'wall s':>8}{'download p50 ms':>17}{'probes':>8}{'probe p50 ms':>14}{'probe max ms':>14}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['wall_s']:>8.2f}{r['download_p50_ms']:>17.1f}{r['probe_requests']:>8}"
+              f"{r['probe_p50_ms'] or 0:>14.1f}{r['probe_max_ms'] or 0:>14.1f}")
+
+    if args.json:
+        write_json(args.json, {'clients': args.clients, 'workers': args.workers, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
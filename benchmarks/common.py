@@ -0,0 +1,85 @@
+"""
+Shared helpers for the scripts in benchmarks/.
+
+Every script runs against a scratch SQLite file (never db.sqlite3 or Azure
+SQL) so it can seed as many synthetic surveys as it needs. Run them from
+the repository root, e.g.::
+
+    python -m benchmarks.query_lookups --rows 200000
+"""
+import atexit
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def remove_scratch_db(db_path):
+    from django.db import connections
+
+    connections.close_all()
+    for path in (db_path, f'{db_path}-wal', f'{db_path}-shm', f'{db_path}-journal'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def setup_django(db_path=None):
+    """
+    Point Django at a scratch SQLite database, set it up and return its
+    path. A temporary one is made when ``db_path`` is None, and removed
+    when the script exits.
+    """
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='cqhei-bench-', suffix='.sqlite3')
+        os.close(fd)
+        atexit.register(remove_scratch_db, db_path)
+    os.environ['SQLITE_PATH'] = str(db_path)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'cqhei_project.settings'
+    # settings only pick Azure SQL when this is set
+    os.environ.pop('WEBSITE_HOSTNAME', None)
+
+    import django
+    django.setup()
+    return db_path
+
+
+def migrate(target=None):
+    """Migrate cqhei_app to ``target`` (a migration name), or fully."""
+    from django.core.management import call_command
+
+    if target is None:
+        call_command('migrate', verbosity=0)
+    else:
+        call_command('migrate', 'cqhei_app', target, verbosity=0)
+
+
+def seed_surveys(n, seed=0, batch_size=100_000):
+    """
+    Insert ``n`` synthetic surveys and their Cover rows (see
+    cqhei_app/synthetic.py): sites are spread over 200 rivers with 50
+    river miles each so site lookups return a realistic handful of rows.
+    """
+    from cqhei_app.synthetic import write_surveys
+
+    return write_surveys(n, seed=seed, batch_size=batch_size)
+
+
+def timed(fn, repeat=5):
+    """Run ``fn`` ``repeat`` times; return min and median wall time in ms."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'min_ms': round(min(samples), 3), 'median_ms': round(statistics.median(samples), 3)}
+
+
+def write_json(path, payload):
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, default=str)
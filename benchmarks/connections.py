@@ -0,0 +1,80 @@
+"""
+Drive survey-list requests through the WSGI handler with and without
+persistent connections and report latency and the connection hit rate:
+
+    python -m benchmarks.connections [--requests 500] [--max-age 600] [--json out.json]
+
+"per request" sets CONN_MAX_AGE=0, so Django closes the connection after
+every request and the next one reconnects; "persistent" keeps it for
+``--max-age`` seconds with health checks on. On the local SQLite stand-in
+connecting is cheap, so the hit rate is the number to compare; on Azure
+SQL each miss is a TLS handshake and login.
+"""
+import argparse
+import statistics
+import time
+
+from .common import migrate, seed_surveys, setup_django, write_json
+
+
+def run(n, max_age):
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import RequestFactory
+
+    from cqhei_app import connections
+
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    connection.settings_dict['CONN_MAX_AGE'] = max_age
+    connection.settings_dict['CONN_HEALTH_CHECKS'] = max_age != 0
+    connection.close()
+    connections.reset()
+
+    samples = []
+    statuses = []
+    for _ in range(n):
+        environ = factory.get('/surveys/', HTTP_HOST='localhost').environ
+        started = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b''.join(response)
+        response.close()  # sends request_finished
+        samples.append((time.perf_counter() - started) * 1000)
+
+    if set(statuses) != {'200 OK'}:
+        raise SystemExit(f"unexpected responses: {sorted(set(statuses))}")
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(statistics.quantiles(samples, n=20)[-1], 3),
+        **connections.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--max-age', type=int, default=600)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    seed_surveys(args.rows)
+
+    results = {
+        'per request': run(args.requests, 0),
+        'persistent': run(args.requests, args.max_age),
+    }
+
+    print(f"GET /surveys/ x {args.requests}\n")
+    print(f"{'mode':<14}{'median ms':>11}{'p95 ms':>10}{'opened':>8}{'hit rate':>10}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['median_ms']:>11.3f}{r['p95_ms']:>10.3f}{r['opened']:>8}{r['hit_rate']:>10.2%}")
+
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
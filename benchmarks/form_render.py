@@ -0,0 +1,76 @@
+"""
+Time a GET of the survey form page with and without the render caches.
+
+"before" compiles templates on every request (no cached loader) and
+renders all of the form's widgets; "after" uses the project settings, so
+templates are compiled once and the unbound form markup comes from the
+fragment cache:
+
+    python -m benchmarks.form_render [--repeat 200] [--json out.json]
+"""
+import argparse
+
+from .common import setup_django, timed, write_json
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def render_page():
+    from django.test import RequestFactory
+
+    from cqhei_app.views import survey_form
+
+    request = RequestFactory().get('/')
+    return lambda: survey_form(request)
+
+
+def uncached_templates():
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    engine = settings.TEMPLATES[0]
+    options = {**engine['OPTIONS'], 'loaders': UNCACHED_LOADERS}
+    return override_settings(TEMPLATES=[{**engine, 'OPTIONS': options}])
+
+
+def run(repeat):
+    from django.core.cache import caches
+
+    fragments = caches['fragments']
+    page = render_page()
+
+    def cold():
+        fragments.clear()
+        page()
+
+    with uncached_templates():
+        before = timed(cold, repeat=repeat)
+
+    page()  # warm the loader and the fragment
+    after = timed(page, repeat=repeat)
+    return before, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    before, after = run(args.repeat)
+
+    b, a = before['median_ms'], after['median_ms']
+    print(f"survey_form GET, median of {args.repeat} renders\n")
+    print(f"{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    print(f"{b:>12.3f}{a:>12.3f}{b / a if a else float('inf'):>9.1f}x")
+
+    if args.json:
+        write_json(args.json, {'before': before, 'after': after})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Drive every route in benchmarks.routes through the test client with the
+slow-query wrapper installed and list the query fingerprints by total time:
+
+    python -m benchmarks.query_fingerprints [--rows 10000] [--requests 50] [--top 15] [--json out.json]
+
+Plans are printed for the fingerprints whose slowest run took at least
+--explain-ms, to show which CQHEISurvey and Cover lookups scan rather
+than search an index.
+"""
+import argparse
+import json
+import logging
+
+from .common import migrate, seed_surveys, setup_django, write_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--explain-ms', type=float, default=5.0)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    migrate()
+    seed_surveys(args.rows)
+
+    from django.conf import settings
+    from django.db import connection
+
+    from cqhei_app import slow_queries
+
+    from .routes import run_client
+
+    settings.SLOW_QUERY_LOG = True
+    settings.SLOW_QUERY_MS = args.explain_ms
+    plans = {}
+
+    class Plans(logging.Handler):
+        def emit(self, record):
+            entry = json.loads(record.getMessage())
+            plans.setdefault(entry['fingerprint'], (entry['call_site'], entry['plan']))
+
+    logger = logging.getLogger('cqhei_app.slow_queries')
+    logger.addHandler(Plans())
+    logger.propagate = False
+
+    connection.ensure_connection()
+    slow_queries.install(None, connection)
+    slow_queries.reset()
+    run_client(args.requests)
+    top = slow_queries.stats(args.top)
+
+    print(f"{args.rows} surveys, {args.requests} requests per route")
+    print(f"{'count':>7}{'total ms':>11}{'max ms':>9}  fingerprint")
+    for entry in top:
+        print(f"{entry['count']:>7}{entry['total_ms']:>11.1f}{entry['max_ms']:>9.2f}  {entry['fingerprint'][:110]}")
+        if entry['fingerprint'] in plans:
+            call_site, plan = plans[entry['fingerprint']]
+            print(f"{'':>29}at {call_site}")
+            for line in plan or []:
+                print(f"{'':>29}plan: {line}")
+
+    if args.json:
+        write_json(args.json, {
+            'rows': args.rows,
+            'requests': args.requests,
+            'fingerprints': [{**entry, 'plan': plans.get(entry['fingerprint'], (None, None))[1]} for entry in top],
+        })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Time the standard CQHEISurvey lookups before and after the composite
+indexes of migration 0011.
+
+Seeds a scratch SQLite database at the migration just before the indexes,
+times each lookup, applies the indexes and times them again:
+
+    python -m benchmarks.query_lookups --rows 200000 [--json out.json]
+"""
+import argparse
+import datetime
+
+from .common import migrate, seed_surveys, setup_django, timed, write_json
+
+BEFORE = '0010_local_cover_survey_index'
+AFTER = '0011_survey_lookup_indexes'
+
+
+def lookups():
+    from django.db.models import Q
+
+    from cqhei_app.models import CQHEISurvey
+
+    surveys = CQHEISurvey.objects
+    since = datetime.date(2015, 1, 1)
+    until = datetime.date(2016, 1, 1)
+    return {
+        'site history (river_code + river_mile)': lambda: list(
+            surveys.filter(river_code='R042', river_mile='25.00')
+            .order_by('survey_date').values_list('id', 'survey_date')
+        ),
+        'named site (river_code + river_site)': lambda: list(
+            surveys.filter(river_code='R042', river_site='R042 site 10')
+            .order_by('survey_date').values_list('id', 'survey_date')
+        ),
+        'river in date range': lambda: list(
+            surveys.filter(river_code='R042', survey_date__range=(since, until))
+            .values_list('id', flat=True)
+        ),
+        'cluster': lambda: list(
+            surveys.filter(cluster_number='417').values_list('id', flat=True)
+        ),
+        'list page (newest first)': lambda: list(
+            surveys.order_by('-survey_date', '-id').values('id', 'survey_date')[:51]
+        ),
+        'list page, seek past cursor': lambda: list(
+            surveys.filter(survey_date__lte=since)
+            .filter(Q(survey_date__lt=since) | Q(id__lt=10**9))
+            .order_by('-survey_date', '-id').values('id', 'survey_date')[:51]
+        ),
+        'list page filtered by river': lambda: list(
+            surveys.filter(river_code='R042')
+            .order_by('-survey_date', '-id').values('id', 'survey_date')[:51]
+        ),
+    }
+
+
+def run(repeat):
+    return {name: timed(fn, repeat=repeat) for name, fn in lookups().items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    migrate(BEFORE)
+    seed_surveys(args.rows)
+
+    before = run(args.repeat)
+    migrate(AFTER)
+    after = run(args.repeat)
+
+    print(f"{args.rows} surveys in {db_path}; median of {args.repeat} runs\n")
+    print(f"{'lookup':<42}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        b, a = before[name]['median_ms'], after[name]['median_ms']
+        print(f"{name:<42}{b:>12.2f}{a:>12.2f}{b / a if a else float('inf'):>9.1f}x")
+
+    if args.json:
+        write_json(args.json, {'rows': args.rows, 'before': before, 'after': after})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+End-to-end benchmark of the app's URL routes:
+
+    python -m benchmarks.routes [--rows 10000] [--requests 200] [--json out.json] [--baseline old.json]
+
+Seeds ``--rows`` synthetic surveys into a scratch SQLite database, then
+drives every route in ROUTES twice:
+
+* through Django's test client in this process, which also records the
+  database queries each request runs;
+* against a real gunicorn (gunicorn.conf.py, ``--mode`` worker class)
+  with ``--concurrency`` client threads.
+
+Each run reports requests/sec and p50/p95/p99 latency per route.
+Save the results with --json and pass an earlier file as --baseline to see
+what changed between commits; routes whose p50 grew by more than
+--threshold or whose query count changed are flagged.
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import ROOT, migrate, seed_surveys, setup_django, write_json
+from .serving import MODES, start_server
+
+SURVEY_POST = {
+    'survey_date': '2024-06-01',
+    'river_code': 'R001',
+    'river_mile': '12.50',
+    'river_site': 'R001 site 5',
+    'name_group': 'Benchmark crew',
+    'reach_length': '100m',
+    'substrate_mostly_large': 'on',
+    'cover_boulders': 'on',
+    'cover_water_plants': 'on',
+    'width_narrow': 'on',
+}
+
+# (name, method, path, POST data)
+ROUTES = [
+    ('survey_form GET', 'GET', '/', None),
+    ('survey_form POST', 'POST', '/', SURVEY_POST),
+    ('survey_success', 'GET', '/success/1/', None),
+    ('survey_list', 'GET', '/surveys/', None),
+    ('export_surveys', 'GET', '/export/', None),
+]
+
+# any 32 alphanumerics work as a CSRF secret when cookie and header match
+CSRF_TOKEN = 'b' * 32
+
+
+def summarize(samples, elapsed):
+    percentiles = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentiles[94], 3),
+        'p99_ms': round(percentiles[98], 3),
+    }
+
+
+def run_client(requests):
+    """Drive each route through the test client, counting queries per request."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client(HTTP_HOST='localhost')
+    results = {}
+
+    # the survey_form POST view prints debug lines on every request
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for name, method, path, data in ROUTES:
+            samples = []
+            queries = []
+            started = time.perf_counter()
+            for _ in range(requests):
+                t = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    if method == 'POST':
+                        response = client.post(path, data)
+                    else:
+                        response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                samples.append((time.perf_counter() - t) * 1000)
+                queries.append(len(captured))
+                if response.status_code != 200:
+                    raise SystemExit(f"{name}: HTTP {response.status_code}")
+            results[name] = {
+                **summarize(samples, time.perf_counter() - started),
+                'queries': max(queries),
+            }
+    return results
+
+
+def send(url, data=None):
+    request = urllib.request.Request(url)
+    if data is not None:
+        request.data = urllib.parse.urlencode(data).encode()
+        request.add_header('Cookie', f'csrftoken={CSRF_TOKEN}')
+        request.add_header('X-CSRFToken', CSRF_TOKEN)
+    started = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        while response.read(65536):
+            pass
+    return (time.perf_counter() - started) * 1000
+
+
+def run_server(db_path, mode, requests, concurrency):
+    """Drive each route against a real gunicorn with ``concurrency`` client threads."""
+    server, base = start_server(db_path, MODES[mode])
+    results = {}
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            for name, method, path, data in ROUTES:
+                started = time.perf_counter()
+                samples = list(pool.map(lambda _: send(base + path, data), range(requests)))
+                results[name] = summarize(samples, time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(title, results):
+    print(f"\n{title}")
+    print(f"{'route':<20}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}")
+    for name, r in results.items():
+        queries = r.get('queries', '')
+        print(f"{name:<20}{r['rps']:>9.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{queries:>9}")
+
+
+def compare(results, baseline, threshold):
+    """Print p50 and query-count changes against ``baseline``; return the regressions."""
+    regressions = []
+    print(f"\nvs baseline {baseline.get('commit') or '?'} (p50 change, queries)")
+    for kind in ('client', 'server'):
+        for name, r in results[kind].items():
+            old = baseline.get(kind, {}).get(name)
+            if not old:
+                continue
+            change = r['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] else 0.0
+            queries = f"{old.get('queries')} -> {r.get('queries')}" if 'queries' in r else ''
+            flag = ''
+            if change > threshold or r.get('queries') != old.get('queries'):
+                flag = '  <-- regression'
+                regressions.append(f'{kind} {name}')
+            print(f"{kind:<8}{name:<20}{change:>+9.1%}  {queries}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mode', choices=sorted(MODES), default='gthread')
+    parser.add_argument('--json', help="Also write results to this file.")
+    parser.add_argument('--baseline', help="Earlier --json output to compare against.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Flag p50 growth above this fraction.")
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    migrate()
+    seed_surveys(args.rows)
+
+    results = {
+        'commit': git_commit(),
+        'rows': args.rows,
+        'mode': args.mode,
+        'client': run_client(args.requests),
+        'server': run_server(db_path, args.mode, args.requests, args.concurrency),
+    }
+
+    print(f"{args.rows} surveys, {args.requests} requests per route, commit {results['commit']}")
+    print_table("test client (in process)", results['client'])
+    print_table(f"gunicorn {args.mode}, {args.concurrency} concurrent clients", results['server'])
+
+    if args.json:
+        write_json(args.json, results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Load-test the form, list and export endpoints under each gunicorn worker
+model from gunicorn.conf.py and report requests/sec and latency:
+
+    python -m benchmarks.serving [--requests 400] [--concurrency 16] [--rows 5000] [--json out.json]
+
+For every mode a real gunicorn is started on a free local port against a
+seeded scratch SQLite database, and ``--concurrency`` client threads send
+``--requests`` GETs to each endpoint. Worker and thread counts come from
+the config's CPU-based defaults unless --workers/--threads are given.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import ROOT, migrate, seed_surveys, setup_django, write_json
+
+ENDPOINTS = {
+    'survey_form': '/',
+    'survey_list': '/surveys/',
+    'export_surveys': '/export/',
+}
+
+MODES = {
+    'sync': {'GUNICORNWORKERCLASS': 'sync'},
+    'gthread': {'GUNICORNWORKERCLASS': 'gthread'},
+    'gthread+preload': {'GUNICORNWORKERCLASS': 'gthread', 'GUNICORNPRELOAD': 'true'},
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, mode_env, workers=None, threads=None,
+                 config='gunicorn.conf.py', app='cqhei_project.wsgi:application'):
+    port = free_port()
+    env = {
+        **os.environ,
+        **mode_env,
+        'SQLITE_PATH': str(db_path),
+        'GUNICORNBIND': f'127.0.0.1:{port}',
+    }
+    # wsgi.py and asgi.py each pick their own settings module
+    env.pop('DJANGO_SETTINGS_MODULE', None)
+    env.pop('WEBSITE_HOSTNAME', None)
+    if workers:
+        env['GUNICORNWORKERS'] = str(workers)
+    if threads:
+        env['GUNICORNTHREADS'] = str(threads)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config, app],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base + '/', timeout=1).read()
+            return server, base
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f"gunicorn did not start (mode {mode_env})")
+
+
+def fetch(url):
+    started = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=120) as response:
+        while response.read(65536):
+            pass
+    return (time.perf_counter() - started) * 1000
+
+
+def load(url, requests, concurrency):
+    """Send ``requests`` GETs over ``concurrency`` threads; return rps and latency percentiles."""
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        samples = list(pool.map(fetch, [url] * requests))
+        elapsed = time.perf_counter() - started
+    percentiles = statistics.quantiles(samples, n=100)
+    return {
+        'rps': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(samples), 3),
+        'p99_ms': round(percentiles[98], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    db_path = setup_django()
+    migrate()
+    seed_surveys(args.rows)
+
+    results = {}
+    for mode, mode_env in MODES.items():
+        server, base = start_server(db_path, mode_env, args.workers, args.threads)
+        try:
+            results[mode] = {
+                name: load(base + path, args.requests, args.concurrency)
+                for name, path in ENDPOINTS.items()
+            }
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.requests} GETs per endpoint, {args.concurrency} concurrent clients, "
+          f"{args.rows} surveys, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<18}{'endpoint':<16}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode, endpoints in results.items():
+        for name, r in endpoints.items():
+            print(f"{mode:<18}{name:<16}{r['rps']:>9.1f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    if args.json:
+        write_json(args.json, {'rows': args.rows, 'concurrency': args.concurrency, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare the three ways of validating survey rows against the form rules:
+one CQHEISurveyForm per row, validators.validate_row per row, and one
+validators.validate_batch call over the columns:
+
+    python -m benchmarks.validation [--rows 20000] [--json out.json]
+
+Rows are raw CSV-style strings with roughly one in ten invalid; the
+script also checks that all three paths report the same errors.
+"""
+import argparse
+
+from .common import setup_django, timed, write_json
+
+
+def make_rows(n, seed=0):
+    import numpy as np
+
+    from cqhei_app.rubric import SCORE_FIELDS
+
+    rng = np.random.default_rng(seed)
+    lengths = ['50m', '100m', '150m', '200m', 'other']
+    ticked = rng.random((n, len(SCORE_FIELDS))) < 0.08
+    rows = []
+    for i in range(n):
+        row = {
+            'survey_date': f'20{rng.integers(0, 24):02d}-0{rng.integers(1, 10)}-1{rng.integers(0, 10)}',
+            'river_code': f'R{rng.integers(0, 200):03d}',
+            'river_mile': f'{rng.integers(-10, 1100) / 4:.2f}',
+            'river_site': f'Site {rng.integers(0, 50)}',
+            'name_group': 'Benchmark crew',
+            'reach_length': lengths[rng.integers(0, len(lengths))],
+            'reach_length_custom': '' if rng.random() < 0.5 else '80m',
+        }
+        row.update((SCORE_FIELDS[j], '1') for j in ticked[i].nonzero()[0])
+        rows.append(row)
+    return rows
+
+
+def paths(rows):
+    from cqhei_app.forms import CQHEISurveyForm
+    from cqhei_app.validators import validate_batch, validate_row
+
+    def forms():
+        out = []
+        for row in rows:
+            form = CQHEISurveyForm(data=row)
+            form.is_valid()
+            out.append({k: list(v) for k, v in form.errors.items()})
+        return out
+
+    def per_row():
+        return [validate_row(row)[1] for row in rows]
+
+    def batch():
+        names = {name for row in rows for name in row}
+        return validate_batch({name: [row.get(name) for row in rows] for name in names})[2]
+
+    return {'form per row': forms, 'validate_row': per_row, 'validate_batch': batch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Also write results to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    rows = make_rows(args.rows)
+    fns = paths(rows)
+
+    reference = fns['form per row']()
+    for name, fn in fns.items():
+        if fn() != reference:
+            raise SystemExit(f"{name} disagrees with the form")
+    invalid = sum(1 for errors in reference if errors)
+
+    results = {name: timed(fn, repeat=args.repeat) for name, fn in fns.items()}
+
+    print(f"{args.rows} rows ({invalid} invalid); median of {args.repeat} runs\n")
+    print(f"{'path':<18}{'ms':>10}{'rows/sec':>12}{'vs form':>10}")
+    base = results['form per row']['median_ms']
+    for name, timing in results.items():
+        ms = timing['median_ms']
+        print(f"{name:<18}{ms:>10.1f}{args.rows / ms * 1000:>12.0f}{base / ms:>9.1f}x")
+
+    if args.json:
+        write_json(args.json, {'rows': args.rows, 'invalid': invalid, 'results': results})
+
+
+if __name__ == '__main__':
+    main()
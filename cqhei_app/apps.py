@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CqheiAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cqhei_app'
+
+    def ready(self):
+        # registers the SiteSummary, connection-reuse and slow-query receivers
+        from . import connections, signals, slow_queries  # noqa: F401
@@ -0,0 +1,17 @@
+"""
+cqhei_app/urls.py with the I/O-bound views swapped for their async
+versions; used under ASGI via cqhei_project/async_urls.py.
+"""
+from django.urls import path
+from . import async_views, views
+
+urlpatterns = [
+    path('', views.survey_form, name='survey_form'),
+    path('success/<int:survey_id>/', views.survey_success, name='survey_success'),
+    path('surveys/', async_views.survey_list, name='survey_list'),
+    path('export/', async_views.export_surveys_csv, name='export_surveys'),
+    path('import/', views.import_surveys, name='import_surveys'),
+    path('series/<str:river_code>/<path:river_site>/', async_views.site_series, name='site_series'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/<str:name>/', views.profile_report, name='profile_report'),
+]
@@ -0,0 +1,59 @@
+"""
+Async versions of the read-only, I/O-bound views, served when the app
+runs under ASGI (cqhei_project/asgi.py routes to cqhei_app/async_urls.py).
+
+They share their query building and rendering with views.py; only the
+waiting differs. Queries go through the async ORM interface (or
+sync_to_async where it falls short) and the export is an async streaming
+response, so while a query runs or a slow client drains a large CSV the
+event loop keeps serving other requests instead of holding a worker.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .covers import with_cover_scores
+from .models import CQHEISurvey
+from .series import series_json
+from .views import EXPORT_CHUNK_SIZE, EXPORT_VALUES, ExportWriter, list_page, list_queryset
+
+
+async def survey_list(request):
+    queryset, filters, cursor = list_queryset(request)
+    surveys = [row async for row in queryset]
+    return list_page(request, surveys, filters, cursor)
+
+
+async def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    views.export_rows with each chunk fetched off the event loop.
+
+    QuerySet.aiterator() would do the same, but on a values_list() it runs
+    the query inside the event loop and raises SynchronousOnlyOperation,
+    so the chunks of the sync iterator are pulled with sync_to_async here.
+    """
+    out = ExportWriter(chunk_size)
+    rows = with_cover_scores(queryset).values_list(*EXPORT_VALUES).iterator(chunk_size=chunk_size)
+    while chunk := await sync_to_async(list)(islice(rows, chunk_size)):
+        for row in chunk:
+            block = out.write(row)
+            if block:
+                yield block
+    yield out.flush()
+
+
+async def export_surveys_csv(request):
+    queryset = CQHEISurvey.objects.order_by('id')
+
+    response = StreamingHttpResponse(export_rows(queryset), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="cqhei_surveys.csv"'
+    return response
+
+
+@require_GET
+async def site_series(request, river_code, river_site):
+    # a cache hit is a single read; a miss queries and encodes once
+    payload = await sync_to_async(series_json)(river_code, river_site)
+    return HttpResponse(payload, content_type='application/json')
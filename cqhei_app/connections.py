@@ -0,0 +1,93 @@
+"""
+Per-process counters for database connection reuse.
+
+With CONN_MAX_AGE set (see settings.py) a worker thread keeps its
+connection between requests; Django closes it at the start or end of a
+request once it is older than the max age, or when the health check finds
+it unusable, and the next query opens a fresh one. Of the requests that
+ran at least one query, those that opened no connection got a reused one:
+
+    >>> connections.stats()
+    {'requests': 1500, 'db_requests': 1200, 'opened': 4, 'reused': 1196,
+     'hit_rate': 0.9967, 'by_alias': {'default': 4}}
+
+Requests that never touch the database (a redirect, a cached series, the
+metrics page) count towards ``requests`` only, so they cannot inflate the
+hit rate. Whether a request ran a query is noted by an execute wrapper put
+on each connection as it opens.
+
+Connected in CqheiAppConfig.ready().
+"""
+import threading
+from collections import Counter
+
+from django.core.signals import request_finished, request_started
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_requests = 0
+_db_requests = 0
+_reused = 0
+_opened = Counter()
+# what the request on this thread has done so far
+_local = threading.local()
+
+
+def note_query(execute, sql, params, many, context):
+    _local.queried = True
+    return execute(sql, params, many, context)
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    global _requests
+    _local.queried = False
+    _local.connected = False
+    with _lock:
+        _requests += 1
+
+
+@receiver(request_finished)
+def count_db_request(sender, **kwargs):
+    global _db_requests, _reused
+    if not getattr(_local, 'queried', False):
+        return
+    with _lock:
+        _db_requests += 1
+        _reused += not _local.connected
+    _local.queried = False
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    _local.connected = True
+    with _lock:
+        _opened[connection.alias] += 1
+    if note_query not in connection.execute_wrappers:
+        # first, not last, for the same reason as slow_queries.install
+        connection.execute_wrappers.insert(0, note_query)
+
+
+def stats():
+    """Requests served, those that queried, and connections opened by this process so far."""
+    with _lock:
+        requests = _requests
+        db_requests = _db_requests
+        reused = _reused
+        by_alias = dict(_opened)
+    return {
+        'requests': requests,
+        'db_requests': db_requests,
+        'opened': sum(by_alias.values()),
+        'reused': reused,
+        'hit_rate': round(reused / db_requests, 4) if db_requests else None,
+        'by_alias': by_alias,
+    }
+
+
+def reset():
+    global _requests, _db_requests, _reused
+    with _lock:
+        _requests = _db_requests = _reused = 0
+        _opened.clear()
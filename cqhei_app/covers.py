@@ -0,0 +1,285 @@
+"""
+Writes to the Section II table ``cQHEI.Cover``.
+
+Cover is unmanaged: on Azure SQL the table (and its computed Cover_Score
+column) is owned by the database, and locally migration 0009 creates a
+SQLite stand-in. The ORM cannot insert into it because Cover_Score is
+computed, so rows are written with raw SQL here, and surveys pick their
+score up through the raw subquery in with_cover_scores().
+"""
+from django.db import connection, transaction
+from django.db.models import F, IntegerField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Cover, CQHEISurvey
+
+# Sent after every write with ``scores={cqhei_new_x_id: cover_score}``,
+# ``created``: False when rows may have been updated in place (upserts), and
+# ``has_survey``: False when the keys are not CQHEISurvey ids (survey_form)
+cover_written = Signal()
+
+# CQHEISurvey checkbox -> cQHEI.Cover column, in insert order
+COVER_COLUMNS = [
+    ('cover_underwater_tree_roots_large', 'Underwater_Tree_Roots'),
+    ('cover_underwater_tree_rootlets', 'Underwater_Tree_Rootlets'),
+    ('cover_boulders', 'Boulders'),
+    ('cover_backwaters', 'Oxbows_Backwaters'),
+    ('cover_downed_trees', 'Downed_trees'),
+    ('cover_shallow_slow_areas', 'Shallows'),
+    ('cover_water_plants', 'Water_Plants'),
+    ('cover_deep_areas', 'Deep_Pools'),
+    ('cover_shrubs_small_trees', 'Overhanging_Vegetation'),
+    ('cover_undercut_banks', 'Undercut_Banks'),
+]
+
+INSERT_COLUMNS = [
+    'cQHEI_New_X_ID',
+    *(column for _, column in COVER_COLUMNS),
+    'Created_Timestamp',
+    'Last_Updated_Timestamp',
+]
+
+
+def score(val):
+    """Normalize a checkbox to the points stored in its Cover column."""
+    return 2 if val else 0
+
+
+def cover_table():
+    # On SQL Server cQHEI is a schema; elsewhere the dotted name is the table name
+    if connection.vendor == 'microsoft':
+        return 'cQHEI.Cover'
+    return connection.ops.quote_name(Cover._meta.db_table)
+
+
+def cover_values(survey_id, data, now):
+    """INSERT_COLUMNS values for one survey; ``data`` is a dict of checkboxes."""
+    return [
+        survey_id,
+        *(score(data.get(field)) for field, _ in COVER_COLUMNS),
+        now,
+        now,
+    ]
+
+
+def _send_written(written, created=True):
+    if written:
+        cover_written.send(
+            sender=Cover,
+            scores={survey_id: score for survey_id, (_id, score) in written.items()},
+            created=created,
+        )
+
+
+def cover_scores(survey_ids=None):
+    """
+    Return ``{cqhei_new_x_id: cover_score}`` for ``survey_ids`` (or every
+    row when None). If a survey has several Cover rows the newest wins.
+    """
+    table = cover_table()
+    scores = {}
+    with connection.cursor() as cursor:
+        if survey_ids is None:
+            cursor.execute(f'SELECT cQHEI_New_X_ID, Cover_Score FROM {table} ORDER BY Cover_ID')
+            scores.update(cursor.fetchall())
+            return scores
+
+        survey_ids = list(survey_ids)
+        size = connection.features.max_query_params or 2000
+        for start in range(0, len(survey_ids), size):
+            chunk = survey_ids[start:start + size]
+            cursor.execute(
+                f'SELECT cQHEI_New_X_ID, Cover_Score FROM {table} '
+                f'WHERE cQHEI_New_X_ID IN ({", ".join(["%s"] * len(chunk))}) ORDER BY Cover_ID',
+                chunk,
+            )
+            scores.update(cursor.fetchall())
+    return scores
+
+
+def cover_score_sql():
+    """
+    A correlated subquery for the newest Cover_Score of the CQHEISurvey row
+    in the outer query, found through cover_survey_idx. Raw because the ORM
+    would quote ``cQHEI.Cover`` as a single name on SQL Server.
+    """
+    survey_id = f'{connection.ops.quote_name(CQHEISurvey._meta.db_table)}.{connection.ops.quote_name("id")}'
+    if connection.vendor == 'microsoft':
+        return (
+            f'SELECT TOP 1 Cover_Score FROM {cover_table()} '
+            f'WHERE cQHEI_New_X_ID = {survey_id} ORDER BY Cover_ID DESC'
+        )
+    return (
+        f'SELECT Cover_Score FROM {cover_table()} '
+        f'WHERE cQHEI_New_X_ID = {survey_id} ORDER BY Cover_ID DESC LIMIT 1'
+    )
+
+
+def cover_count_sql():
+    """A correlated subquery for the number of Cover rows of the CQHEISurvey row in the outer query."""
+    survey_id = f'{connection.ops.quote_name(CQHEISurvey._meta.db_table)}.{connection.ops.quote_name("id")}'
+    return f'SELECT COUNT(*) FROM {cover_table()} WHERE cQHEI_New_X_ID = {survey_id}'
+
+
+def with_cover_scores(queryset, name='section2_score'):
+    """
+    Annotate a CQHEISurvey queryset with each survey's Section II score as
+    ``name``, read in the same statement: the cQHEI.Cover row's Cover_Score,
+    or the survey's own cover_score when it has no Cover row.
+    """
+    return queryset.annotate(**{name: Coalesce(
+        RawSQL(cover_score_sql(), [], output_field=IntegerField()), F('cover_score'),
+    )})
+
+
+def _returning_sql(n_rows):
+    """
+    Multi-row INSERT that hands back each row's key, Cover_ID and the
+    computed Cover_Score in the same statement.
+    """
+    table = cover_table()
+    columns = ', '.join(INSERT_COLUMNS)
+    values = ', '.join(['({})'.format(', '.join(['%s'] * len(INSERT_COLUMNS)))] * n_rows)
+    if connection.vendor == 'microsoft':
+        return (
+            f'INSERT INTO {table} ({columns}) '
+            f'OUTPUT INSERTED.cQHEI_New_X_ID, INSERTED.Cover_ID, INSERTED.Cover_Score '
+            f'VALUES {values}'
+        )
+    return (
+        f'INSERT INTO {table} ({columns}) VALUES {values} '
+        f'RETURNING cQHEI_New_X_ID, Cover_ID, Cover_Score'
+    )
+
+
+def batch_size():
+    """Rows per INSERT that keep within the backend's bound-parameter limit."""
+    max_params = connection.features.max_query_params or 2000
+    # SQL Server also caps a VALUES list at 1000 rows
+    return max(1, min(1000, max_params // len(INSERT_COLUMNS)))
+
+
+def insert_cover(survey_id, data, has_survey=True):
+    """
+    Insert one survey's Section II row; returns ``(cover_id, cover_score)``
+    from the INSERT itself, with no follow-up SELECT.
+
+    ``has_survey=False`` when no CQHEISurvey row has ``survey_id``, so
+    receivers skip looking it up (see signals.covers_written).
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(_returning_sql(1), cover_values(survey_id, data, now))
+        _survey_id, cover_id, cover_score = cursor.fetchone()
+    cover_written.send(sender=Cover, scores={survey_id: cover_score}, created=True, has_survey=has_survey)
+    return cover_id, cover_score
+
+
+def insert_covers(items):
+    """
+    Insert one Cover row per ``(survey_id, data)`` pair, as few multi-row
+    INSERTs as the parameter limit allows.
+
+    Returns ``{survey_id: (cover_id, cover_score)}``.
+    """
+    now = timezone.now()
+    items = list(items)
+    size = batch_size()
+    written = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), size):
+            chunk = items[start:start + size]
+            params = [
+                value
+                for survey_id, data in chunk
+                for value in cover_values(survey_id, data, now)
+            ]
+            cursor.execute(_returning_sql(len(chunk)), params)
+            for survey_id, cover_id, cover_score in cursor.fetchall():
+                written[survey_id] = (cover_id, cover_score)
+    _send_written(written)
+    return written
+
+
+def _upsert_sql(n_rows):
+    """
+    Set-based upsert keyed by cQHEI_New_X_ID.
+
+    SQL Server: one MERGE taking the key and ten cover columns per row, then
+    the timestamp three times at the end. SQLite: an UPDATE of the rows that
+    exist, taking the same rows and the timestamp once; the rows it does not
+    return are inserted with _returning_sql. Neither needs a unique key,
+    which the Azure SQL table does not have.
+    """
+    table = cover_table()
+    key, *flag_columns = INSERT_COLUMNS[:len(COVER_COLUMNS) + 1]
+    row = '({})'.format(', '.join(['%s'] * (len(flag_columns) + 1)))
+    source_columns = ', '.join([key, *flag_columns])
+
+    if connection.vendor == 'microsoft':
+        updates = ', '.join(f'target.{c} = source.{c}' for c in flag_columns)
+        inserts = ', '.join(f'source.{c}' for c in [key, *flag_columns])
+        return (
+            f'MERGE {table} WITH (HOLDLOCK) AS target '
+            f'USING (VALUES {", ".join([row] * n_rows)}) AS source ({source_columns}) '
+            f'ON target.{key} = source.{key} '
+            f'WHEN MATCHED THEN UPDATE SET {updates}, target.Last_Updated_Timestamp = %s '
+            f'WHEN NOT MATCHED THEN INSERT ({", ".join(INSERT_COLUMNS)}) VALUES ({inserts}, %s, %s) '
+            f'OUTPUT INSERTED.{key}, INSERTED.Cover_ID, INSERTED.Cover_Score;'
+        )
+
+    updates = ', '.join(f'{c} = source.{c}' for c in flag_columns)
+    return (
+        f'WITH source ({source_columns}) AS (VALUES {", ".join([row] * n_rows)}) '
+        f'UPDATE {table} SET {updates}, Last_Updated_Timestamp = %s '
+        f'FROM source WHERE {table}.{key} = source.{key} '
+        f'RETURNING {key}, Cover_ID, Cover_Score'
+    )
+
+
+def upsert_covers(records):
+    """
+    Insert or update the Cover row of each ``(cqhei_new_x_id, data)``
+    record, one MERGE (SQL Server) or an UPDATE plus an INSERT of the new
+    keys (SQLite) per batch. Created_Timestamp is only set on insert; Last_Updated_Timestamp
+    is set on both.
+
+    If a survey appears more than once, its last record wins. Returns
+    ``{cqhei_new_x_id: (cover_id, cover_score)}`` with the recomputed scores.
+    """
+    latest = {}
+    for survey_id, data in records:
+        latest[survey_id] = data
+    items = list(latest.items())
+
+    now = timezone.now()
+    microsoft = connection.vendor == 'microsoft'
+    size = batch_size()
+    written = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(items), size):
+            chunk = items[start:start + size]
+            params = [
+                value
+                for survey_id, data in chunk
+                for value in cover_values(survey_id, data, now)[:-2]
+            ]
+            params += [now, now, now] if microsoft else [now]
+            cursor.execute(_upsert_sql(len(chunk)), params)
+            for survey_id, cover_id, cover_score in cursor.fetchall():
+                written[survey_id] = (cover_id, cover_score)
+            if microsoft:
+                continue
+            new = [(survey_id, data) for survey_id, data in chunk if survey_id not in written]
+            if new:
+                cursor.execute(
+                    _returning_sql(len(new)),
+                    [value for survey_id, data in new for value in cover_values(survey_id, data, now)],
+                )
+                for survey_id, cover_id, cover_score in cursor.fetchall():
+                    written[survey_id] = (cover_id, cover_score)
+    _send_written(written, created=False)
+    return written
@@ -0,0 +1,249 @@
+"""
+Bulk survey import from CSV or JSON.
+
+Rows are checked against the same rules as CQHEISurveyForm without
+building a form per row, chunk by chunk with validators.validate_batch.
+Valid rows go into CQHEISurvey and cQHEI.Cover with one bulk insert per
+table, in one transaction per batch.
+
+For large files ``import_file`` can spread CSV parsing and validation over
+a process pool while the calling process stays the only database writer.
+"""
+import csv
+import io
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.db import transaction
+
+from .covers import insert_covers
+from .models import CQHEISurvey
+from .rubric import SCORE_FIELDS
+from .scoring import score_matrix
+from .series import invalidate as invalidate_series
+from .summaries import add_surveys
+from .validators import INPUT_FIELDS, validate_batch
+
+DEFAULT_BATCH_SIZE = 500
+# rows validated per validate_batch call, and handed to a worker process
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ImportFormatError(ValueError):
+    """The file cannot be read as surveys at all, as opposed to a row failing validation."""
+
+
+def read_rows(fileobj, fmt='csv'):
+    """
+    Yield one dict per survey from a text file object.
+
+    JSON input is either a list of objects or ``{"surveys": [...]}``.
+    Raises ImportFormatError for malformed JSON or CSV, text that is not
+    UTF-8, or JSON of any other shape.
+    """
+    if fmt == 'json':
+        try:
+            data = json.load(fileobj)
+        except ValueError as e:  # also UnicodeDecodeError
+            raise ImportFormatError(f"Not a valid JSON file: {e}") from e
+        if isinstance(data, dict):
+            data = data.get('surveys', [])
+        if not isinstance(data, list) or not all(isinstance(raw, dict) for raw in data):
+            raise ImportFormatError('JSON must be a list of survey objects or {"surveys": [...]}.')
+        yield from data
+    else:
+        try:
+            yield from csv.DictReader(fileobj)
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ImportFormatError(f"Not a valid CSV file: {e}") from e
+
+
+def check_readable(fileobj, fmt='csv'):
+    """
+    Read ``fileobj`` through once and rewind it. Raises ImportFormatError
+    if any of it is unreadable, before a single batch has been written.
+    """
+    for _raw in read_rows(fileobj, fmt):
+        pass
+    fileobj.seek(0)
+
+
+def check_rows(rows, start=1):
+    """
+    Validate a list of raw dicts with one validate_batch call and add the
+    derived cover_score to valid rows. Returns ``(n, data, errors)`` per
+    row, numbered from ``start``.
+    """
+    for i, raw in enumerate(rows):
+        if not isinstance(raw, dict):
+            raise ImportFormatError(f"Row {start + i} is not an object of survey fields.")
+    columns = {name: [raw.get(name) for raw in rows] for name in [*INPUT_FIELDS, *SCORE_FIELDS]}
+    cleaned, matrix, errors = validate_batch(columns)
+    cover_scores = score_matrix(matrix)['section2'].astype(int).tolist()
+
+    results = []
+    for i, (checked, row_errors) in enumerate(zip(matrix.tolist(), errors)):
+        data = {}
+        if not row_errors:
+            data = {name: cleaned[name][i] for name in INPUT_FIELDS}
+            data.update(zip(SCORE_FIELDS, checked))
+            data['cover_score'] = cover_scores[i]
+        results.append((start + i, data, row_errors))
+    return results
+
+
+def _write_batch(batch):
+    surveys = [CQHEISurvey(**data) for data in batch]
+    with transaction.atomic():
+        CQHEISurvey.objects.bulk_create(surveys)
+        # bulk_create sends no post_save
+        add_surveys(surveys)
+        invalidate_series({survey.named_site_key for survey in surveys})
+        insert_covers([(survey.pk, data) for survey, data in zip(surveys, batch)])
+    return len(surveys)
+
+
+def _write_results(results, batch_size):
+    """
+    Insert checked rows in batches as they arrive.
+
+    ``results`` yields ``(n, data, errors)`` in row order. Returns the
+    report described in import_rows.
+    """
+    report = {'rows': 0, 'imported': 0, 'errors': []}
+    batch = []
+    started = time.perf_counter()
+
+    for n, data, errors in results:
+        report['rows'] = n
+        if errors:
+            report['errors'].append({'row': n, 'errors': errors})
+            continue
+
+        batch.append(data)
+        if len(batch) >= batch_size:
+            report['imported'] += _write_batch(batch)
+            batch = []
+
+    if batch:
+        report['imported'] += _write_batch(batch)
+
+    seconds = time.perf_counter() - started
+    report['seconds'] = round(seconds, 3)
+    report['rows_per_sec'] = round(report['rows'] / seconds, 1) if seconds else 0.0
+    return report
+
+
+def import_rows(rows, batch_size=DEFAULT_BATCH_SIZE, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Validate and insert ``rows`` (an iterable of dicts).
+
+    Returns a report dict with the number of rows read and imported, the
+    throughput, and one ``{'row': n, 'errors': {...}}`` entry per rejected
+    row (``n`` is 1-based).
+    """
+    rows = iter(rows)
+
+    def results():
+        start = 1
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield from check_rows(chunk, start)
+            start += len(chunk)
+
+    return _write_results(results(), batch_size)
+
+
+# ============================
+# Parallel import
+# ============================
+
+def _csv_records(fileobj):
+    """
+    Yield raw CSV records (one or more physical lines) without parsing
+    fields; a record ends on a line that leaves its quotes balanced.
+    Blank lines are dropped, as csv.DictReader skips them, so records are
+    numbered as in a serial import.
+    """
+    record = []
+    quotes = 0
+    for line in fileobj:
+        if not record and not line.strip('\r\n'):
+            continue
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield ''.join(record)
+            record = []
+            quotes = 0
+    if record:
+        yield ''.join(record)
+
+
+def _check_csv_chunk(header, start, records):
+    reader = csv.DictReader(io.StringIO(''.join(records)), fieldnames=header)
+    try:
+        rows = list(reader)
+    except csv.Error as e:
+        # the same error a serial import reports; a bare csv.Error would
+        # reach the management command as a traceback
+        raise ImportFormatError(f"Not a valid CSV file: {e}") from e
+    return check_rows(rows, start)
+
+
+def _check_rows_chunk(header, start, rows):
+    return check_rows(rows, start)
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op once apps are loaded
+    django.setup()
+
+
+def import_file(fileobj, fmt='csv', batch_size=DEFAULT_BATCH_SIZE, workers=1,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Import a CSV or JSON text file.
+
+    With ``workers > 1`` chunks of raw records are parsed, normalized and
+    validated in a process pool; results come back in row order and this
+    process inserts them in batches, so there is still a single writer.
+    """
+    if workers <= 1:
+        return import_rows(read_rows(fileobj, fmt), batch_size=batch_size, chunk_size=chunk_size)
+
+    if fmt == 'json':
+        header = None
+        records = iter(list(read_rows(fileobj, 'json')))
+        check_chunk = _check_rows_chunk
+    else:
+        records = _csv_records(fileobj)
+        try:
+            header = next(csv.reader([next(records, '')]), [])
+        except csv.Error as e:
+            raise ImportFormatError(f"Not a valid CSV file: {e}") from e
+        check_chunk = _check_csv_chunk
+
+    def results():
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = deque()
+            start = 1
+            while True:
+                # keep a bounded number of chunks in flight
+                while len(pending) < workers * 2:
+                    chunk = list(islice(records, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(check_chunk, header, start, chunk))
+                    start += len(chunk)
+                if not pending:
+                    return
+                yield from pending.popleft().result()
+
+    return _write_results(results(), batch_size)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from cqhei_app.summaries import rebuild
+from cqhei_app.synthetic import DEFAULT_BATCH_SIZE, write_surveys
+
+
+class Command(BaseCommand):
+    help = "Fill a local SQLite database with synthetic cQHEI surveys and their Cover rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('rows', type=int, help="Number of surveys to generate.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--no-covers', action='store_true', help="Skip the cQHEI.Cover rows.",
+        )
+        parser.add_argument(
+            '--no-summaries', action='store_true',
+            help="Leave SiteSummary as it is instead of rebuilding it afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("generate_surveys only writes to a local SQLite database.")
+        if options['rows'] < 1:
+            raise CommandError("rows must be at least 1.")
+
+        report = write_surveys(
+            options['rows'], seed=options['seed'], batch_size=options['batch_size'],
+            covers=not options['no_covers'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {report['rows']} surveys (ids from {report['first_id']}) "
+            f"in {report['seconds']}s, {report['rows_per_sec']} rows/sec."
+        ))
+
+        if not options['no_summaries']:
+            rebuild()
+            self.stdout.write(self.style.SUCCESS("Rebuilt site summaries."))
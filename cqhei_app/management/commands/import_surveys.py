@@ -0,0 +1,53 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cqhei_app.importer import DEFAULT_BATCH_SIZE, ImportFormatError, import_file
+
+
+class Command(BaseCommand):
+    help = "Import cQHEI surveys from a CSV or JSON file, validating each row like the survey form."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON file to import.")
+        parser.add_argument(
+            '--format', choices=['csv', 'json'],
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help="Processes used to parse and validate rows (default: 1, no pool).",
+        )
+        parser.add_argument(
+            '--report', help="Write the per-row error report to this JSON file.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        fmt = options['format'] or ('json' if path.suffix.lower() == '.json' else 'csv')
+
+        try:
+            with path.open(newline='', encoding='utf-8-sig') as f:
+                report = import_file(
+                    f, fmt, batch_size=options['batch_size'], workers=options['workers'],
+                )
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            raise CommandError(f"{path}: {e}")
+
+        if options['report']:
+            Path(options['report']).write_text(json.dumps(report, indent=2))
+
+        for entry in report['errors'][:20]:
+            self.stderr.write(f"row {entry['row']}: {json.dumps(entry['errors'])}")
+        if len(report['errors']) > 20:
+            self.stderr.write(f"... {len(report['errors']) - 20} more rejected rows")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['imported']} of {report['rows']} rows "
+            f"({len(report['errors'])} rejected) in {report['seconds']}s, "
+            f"{report['rows_per_sec']} rows/sec."
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cqhei_app.summaries import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every SiteSummary row from the survey and Cover tables and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only compare the stored summaries with a fresh computation; fail on drift.",
+        )
+
+    def handle(self, *args, **options):
+        drift = rebuild(check=options['check'])
+
+        for entry in drift[:20]:
+            river_code, river_mile = entry['site']
+            field = entry['field'] or 'row'
+            self.stderr.write(
+                f"{river_code} mile {river_mile}: {field} is {entry['actual']!r}, expected {entry['expected']!r}"
+            )
+        if len(drift) > 20:
+            self.stderr.write(f"... {len(drift) - 20} more differences")
+
+        if options['check']:
+            if drift:
+                raise CommandError(f"{len(drift)} site summary values have drifted.")
+            self.stdout.write(self.style.SUCCESS("Site summaries are up to date."))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt site summaries ({len(drift)} drifted values corrected)."
+            ))
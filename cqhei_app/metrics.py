@@ -0,0 +1,116 @@
+"""
+Prometheus metrics, served at ``/metrics``:
+
+* ``cqhei_request_seconds``: latency histogram by route name and method;
+* ``cqhei_requests_total``: requests by route name, method and status;
+* ``cqhei_request_queries``: database queries per request, by route name;
+* ``cqhei_scores_computed_total``: surveys scored, by ``kind``: ``cover``
+  (Cover_Score computed by cQHEI.Cover on insert or upsert), ``single``
+  (scoring.score_survey) or ``batch`` (rows scored by scoring.score_codes).
+
+Route names are the URL names in urls.py (``survey_form``,
+``export_surveys``...), or ``unmatched``, and methods outside METHODS are
+counted as ``other``, so label cardinality is fixed whatever clients send.
+
+On Azure ``/metrics`` answers 404 unless METRICS_TOKEN is set.
+
+With several worker processes each keeps its values in its own
+memory-mapped file under ``PROMETHEUS_MULTIPROC_DIR``, and ``/metrics``
+sums every file, so any worker answers for all of them. The gunicorn
+configs point it at an emptied directory per bind port when it is not set.
+Without it (runserver, tests) the numbers are those of this process.
+
+As with timing.py, a streaming response (the CSV export) is measured up
+to the point its body starts.
+
+Recording is a handful of in-memory float updates per request. In
+multiprocess mode each one takes prometheus_client's per-process lock,
+which is held for a single mmap write and never across processes.
+"""
+import contextlib
+import os
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from .covers import cover_written
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+request_seconds = Histogram(
+    'cqhei_request_seconds', "Request latency.", ['route', 'method'], buckets=LATENCY_BUCKETS,
+)
+requests_total = Counter(
+    'cqhei_requests', "Requests served.", ['route', 'method', 'status'],
+)
+request_queries = Histogram(
+    'cqhei_request_queries', "Database queries per request.", ['route'], buckets=QUERY_BUCKETS,
+)
+scores_computed = Counter(
+    'cqhei_scores_computed', "Surveys scored.", ['kind'],
+)
+
+
+def count_scores(kind, n=1):
+    # labelled children are made on first use, not at import: in
+    # multiprocess mode each one opens a file in PROMETHEUS_MULTIPROC_DIR
+    scores_computed.labels(kind).inc(n)
+
+
+def cover_scores_written(sender, scores, **kwargs):
+    count_scores('cover', len(scores))
+
+
+cover_written.connect(cover_scores_written, dispatch_uid='cqhei_metrics_cover_scores')
+
+
+def latest():
+    """Return ``(body, content_type)`` of the current metrics, across workers when configured."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class QueryCounter:
+    __slots__ = ('queries',)
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name if match else None) or 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        request_seconds.labels(route, method).observe(elapsed)
+        requests_total.labels(route, method, str(response.status_code)).inc()
+        request_queries.labels(route).observe(counter.queries)
+        return response
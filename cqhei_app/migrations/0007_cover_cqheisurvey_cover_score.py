@@ -0,0 +1,351 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0006_remove_cqheisurvey_cover_underwater_tree_roots_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cover',
+            fields=[
+                ('cover_id', models.AutoField(db_column='Cover_ID', primary_key=True, serialize=False)),
+                ('cqhei_new_x_id', models.IntegerField(db_column='cQHEI_New_X_ID')),
+                ('underwater_tree_roots', models.IntegerField(db_column='Underwater_Tree_Roots', default=0)),
+                ('underwater_tree_rootlets', models.IntegerField(db_column='Underwater_Tree_Rootlets', default=0)),
+                ('boulders', models.IntegerField(db_column='Boulders', default=0)),
+                ('oxbows_backwaters', models.IntegerField(db_column='Oxbows_Backwaters', default=0)),
+                ('downed_trees', models.IntegerField(db_column='Downed_trees', default=0)),
+                ('shallows', models.IntegerField(db_column='Shallows', default=0)),
+                ('water_plants', models.IntegerField(db_column='Water_Plants', default=0)),
+                ('deep_pools', models.IntegerField(db_column='Deep_Pools', default=0)),
+                ('overhanging_vegetation', models.IntegerField(db_column='Overhanging_Vegetation', default=0)),
+                ('undercut_banks', models.IntegerField(db_column='Undercut_Banks', default=0)),
+                ('cover_score', models.IntegerField(blank=True, db_column='Cover_Score', null=True)),
+                ('created_timestamp', models.DateTimeField(auto_now_add=True, db_column='Created_Timestamp')),
+                ('last_updated_timestamp', models.DateTimeField(auto_now=True, db_column='Last_Updated_Timestamp')),
+            ],
+            options={
+                'db_table': 'cQHEI.Cover',
+                'managed': False,
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='cqheisurvey',
+            options={},
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='cover_score',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_backwaters',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_boulders',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_deep_areas',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_downed_trees',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_shallow_slow_areas',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_shrubs_small_trees',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_undercut_banks',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_underwater_tree_rootlets',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_underwater_tree_roots_large',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='cover_water_plants',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='curviness_mostly_straight',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='curviness_one_two_good_bends',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='curviness_two_plus_good_bends',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='curviness_very_straight',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='depth_ankle_deep',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='depth_chest_deep',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='depth_knee_deep',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='depth_waist_deep',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='erosion_open_pasture',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='erosion_raw_collapsing',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='erosion_suburban_rowcrop',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='erosion_urban_industrial',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='flow_fast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='flow_moderate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='flow_none',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='flow_slow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='flow_very_fast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_conservation_tillage',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_fenced_pasture',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_forest_wetland',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_overgrown_fields',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_park',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='landuse_shrubs',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='natural_heavy_changes',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='natural_many_changes',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='natural_minor_changes',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='natural_mostly_natural',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='reach_length',
+            field=models.CharField(choices=[('50m', '50m'), ('100m', '100m'), ('150m', '150m'), ('200m', '200m'), ('500m', '500m'), ('750m', '750m'), ('other', 'Other')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='reach_length_custom',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='riffles_ankle_calf_fast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='riffles_ankle_shallow_slow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='riffles_knee_deep_fast',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='riffles_none',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='shading_mostly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='shading_none',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='shading_partly',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='silting_no',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='silting_yes',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='smothering_no',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='smothering_yes',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_dominated_bedrock',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_fist_size',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_mostly_large',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_mostly_medium',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_mostly_small',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_mostly_very_fine',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_smaller_fingernail',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='substrate_smaller_fist',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='width_narrow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='width_none',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='cqheisurvey',
+            name='width_wide',
+            field=models.BooleanField(default=False),
+        ),
+    ]
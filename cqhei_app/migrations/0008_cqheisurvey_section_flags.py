@@ -0,0 +1,99 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:59
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+# Bit layout at the time of this migration (rubric.SECTION_FIELDS); frozen
+# here so later rubric edits cannot change how existing rows are backfilled.
+SECTION_FIELDS = {
+    'section1_flags': [
+        'substrate_mostly_large', 'substrate_mostly_medium', 'substrate_mostly_small',
+        'substrate_dominated_bedrock', 'substrate_mostly_very_fine',
+        'smothering_no', 'smothering_yes', 'silting_no', 'silting_yes',
+    ],
+    'section2_flags': [
+        'cover_underwater_tree_roots_large', 'cover_underwater_tree_rootlets', 'cover_boulders',
+        'cover_backwaters', 'cover_downed_trees', 'cover_deep_areas', 'cover_undercut_banks',
+        'cover_water_plants', 'cover_shallow_slow_areas', 'cover_shrubs_small_trees',
+    ],
+    'section3_flags': [
+        'curviness_two_plus_good_bends', 'curviness_one_two_good_bends',
+        'curviness_mostly_straight', 'curviness_very_straight',
+        'natural_mostly_natural', 'natural_minor_changes',
+        'natural_many_changes', 'natural_heavy_changes',
+    ],
+    'section4_flags': [
+        'width_wide', 'width_narrow', 'width_none',
+        'landuse_forest_wetland', 'landuse_shrubs', 'landuse_overgrown_fields',
+        'landuse_fenced_pasture', 'landuse_park', 'landuse_conservation_tillage',
+        'erosion_urban_industrial', 'erosion_open_pasture',
+        'erosion_suburban_rowcrop', 'erosion_raw_collapsing',
+        'shading_mostly', 'shading_partly', 'shading_none',
+    ],
+    'section5_flags': [
+        'depth_chest_deep', 'depth_waist_deep', 'depth_knee_deep', 'depth_ankle_deep',
+        'flow_very_fast', 'flow_fast', 'flow_moderate', 'flow_slow', 'flow_none',
+    ],
+    'section6_flags': [
+        'riffles_knee_deep_fast', 'riffles_ankle_calf_fast',
+        'riffles_ankle_shallow_slow', 'riffles_none',
+        'substrate_fist_size', 'substrate_smaller_fist', 'substrate_smaller_fingernail',
+    ],
+}
+
+
+def backfill_section_flags(apps, schema_editor):
+    # One set-based UPDATE instead of loading and saving every row
+    CQHEISurvey = apps.get_model('cqhei_app', 'CQHEISurvey')
+    packed = {}
+    for column, fields in SECTION_FIELDS.items():
+        terms = [
+            Case(When(**{field: True}, then=Value(1 << bit)), default=Value(0), output_field=IntegerField())
+            for bit, field in enumerate(fields)
+        ]
+        expression = terms[0]
+        for term in terms[1:]:
+            expression = expression + term
+        packed[column] = expression
+    CQHEISurvey.objects.update(**packed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0007_cover_cqheisurvey_cover_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section1_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section2_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section3_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section4_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section5_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cqheisurvey',
+            name='section6_flags',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_section_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# cQHEI.Cover is created and owned by Azure SQL. For local SQLite runs
+# (and the test database) create a stand-in with the same columns, where
+# Cover_Score is computed from the ten cover columns as on the server.
+SQLITE_COVER_TABLE = '''
+CREATE TABLE IF NOT EXISTS "cQHEI.Cover" (
+    "Cover_ID" integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    "cQHEI_New_X_ID" integer NOT NULL,
+    "Underwater_Tree_Roots" integer NOT NULL DEFAULT 0,
+    "Underwater_Tree_Rootlets" integer NOT NULL DEFAULT 0,
+    "Boulders" integer NOT NULL DEFAULT 0,
+    "Oxbows_Backwaters" integer NOT NULL DEFAULT 0,
+    "Downed_trees" integer NOT NULL DEFAULT 0,
+    "Shallows" integer NOT NULL DEFAULT 0,
+    "Water_Plants" integer NOT NULL DEFAULT 0,
+    "Deep_Pools" integer NOT NULL DEFAULT 0,
+    "Overhanging_Vegetation" integer NOT NULL DEFAULT 0,
+    "Undercut_Banks" integer NOT NULL DEFAULT 0,
+    "Cover_Score" integer GENERATED ALWAYS AS (
+        "Underwater_Tree_Roots" + "Underwater_Tree_Rootlets" + "Boulders"
+        + "Oxbows_Backwaters" + "Downed_trees" + "Shallows" + "Water_Plants"
+        + "Deep_Pools" + "Overhanging_Vegetation" + "Undercut_Banks"
+    ) STORED,
+    "Created_Timestamp" datetime NOT NULL,
+    "Last_Updated_Timestamp" datetime NOT NULL
+)
+'''
+
+
+def create_local_cover_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(SQLITE_COVER_TABLE)
+
+
+def drop_local_cover_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS "cQHEI.Cover"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0008_cqheisurvey_section_flags'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_local_cover_table, drop_local_cover_table),
+    ]
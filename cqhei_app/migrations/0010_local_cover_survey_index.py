@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+# Index the local stand-in the way 0011 indexes the Azure SQL table. It is
+# not unique: Azure SQL has no unique key on cQHEI_New_X_ID, and two form
+# posts in the same second share a key. covers.upsert_covers matches rows
+# without one.
+def create_survey_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS "cover_survey_idx" '
+        'ON "cQHEI.Cover" ("cQHEI_New_X_ID", "Cover_Score")'
+    )
+
+
+def drop_survey_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "cover_survey_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0009_local_cover_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_survey_index, drop_survey_index),
+    ]
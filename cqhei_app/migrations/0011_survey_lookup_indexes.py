@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:06
+
+from django.db import migrations, models
+
+
+# cQHEI.Cover is unmanaged, so Django never emits its Meta.indexes; create
+# them here. INCLUDE (Cover_Score) lets survey -> score lookups skip the
+# base table. The local SQLite stand-in already has the same index (0010).
+SQL_SERVER_COVER_INDEX = """
+IF NOT EXISTS (
+    SELECT 1 FROM sys.indexes
+    WHERE name = 'cover_survey_idx' AND object_id = OBJECT_ID('cQHEI.Cover')
+)
+CREATE INDEX cover_survey_idx ON cQHEI.Cover (cQHEI_New_X_ID) INCLUDE (Cover_Score)
+"""
+
+
+def create_cover_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'microsoft':
+        schema_editor.execute(SQL_SERVER_COVER_INDEX)
+
+
+def drop_cover_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'microsoft':
+        schema_editor.execute(
+            "IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'cover_survey_idx' "
+            "AND object_id = OBJECT_ID('cQHEI.Cover')) DROP INDEX cover_survey_idx ON cQHEI.Cover"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0010_local_cover_survey_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cqheisurvey',
+            index=models.Index(fields=['survey_date', 'id'], name='survey_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cqheisurvey',
+            index=models.Index(fields=['river_code', 'survey_date', 'id'], name='survey_code_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cqheisurvey',
+            index=models.Index(fields=['river_code', 'river_mile', 'survey_date'], name='survey_code_mile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cqheisurvey',
+            index=models.Index(fields=['river_code', 'river_site', 'survey_date'], name='survey_code_site_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cqheisurvey',
+            index=models.Index(fields=['cluster_number'], name='survey_cluster_idx'),
+        ),
+        migrations.RunPython(create_cover_index, drop_cover_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0011_survey_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('river_code', models.CharField(max_length=50)),
+                ('river_mile', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('survey_count', models.PositiveIntegerField(default=0)),
+                ('cqhei_sum', models.FloatField(default=0)),
+                ('cqhei_min', models.FloatField(blank=True, null=True)),
+                ('cqhei_max', models.FloatField(blank=True, null=True)),
+                ('cover_count', models.PositiveIntegerField(default=0)),
+                ('cover_sum', models.IntegerField(default=0)),
+                ('cover_min', models.IntegerField(blank=True, null=True)),
+                ('cover_max', models.IntegerField(blank=True, null=True)),
+                ('latest_survey_id', models.BigIntegerField(blank=True, null=True)),
+                ('latest_survey_date', models.DateField(blank=True, null=True)),
+                ('latest_cqhei', models.FloatField(blank=True, null=True)),
+                ('latest_cover_score', models.IntegerField(blank=True, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sitesummary',
+            constraint=models.UniqueConstraint(fields=('river_code', 'river_mile'), name='site_summary_site_uniq'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.core.management import call_command
+from django.db import migrations
+
+# CACHES['series'] in settings.py
+CACHE_TABLE = 'cqhei_cache'
+
+
+def create_cache_table(apps, schema_editor):
+    # a no-op when the table exists
+    call_command('createcachetable', CACHE_TABLE, database=schema_editor.connection.alias, verbosity=0)
+
+
+def drop_cache_table(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE {schema_editor.quote_name(CACHE_TABLE)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cqhei_app', '0012_sitesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, drop_cache_table),
+    ]
@@ -1,6 +1,66 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from .rubric import FLAG_FIELDS, SCORE_FIELDS, SECTION_FIELDS, SECTION_NAMES, pack_sections, unpack_sections
+
+
+# A monitoring site is a river mile on a river
+SITE_FIELDS = ['river_code', 'river_mile']
+# ...and the name crews give it, which the score time series is keyed by
+NAMED_SITE_FIELDS = ['river_code', 'river_site']
+
+# CQHEISurvey.clean()'s message; validators.py reports it for bulk rows too
+OTHER_LENGTH_MODEL_ERROR = "Please specify the reach length when 'Other' is selected."
+
+
+class CQHEISurveyQuerySet(models.QuerySet):
+
+    def compact(self):
+        """
+        Compact storage mode: read each section's packed ``*_flags`` column
+        instead of the ~60 checkbox columns. The checkbox attributes are
+        still populated (see CQHEISurvey.from_db), so forms and templates
+        see the same field names.
+        """
+        return self.defer(*SCORE_FIELDS)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so keep the packed columns in sync here
+        for obj in objs:
+            obj.pack_flags()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        # likewise bulk_update: repack, and write the packed columns too
+        if set(fields).intersection(SCORE_FIELDS):
+            for obj in objs:
+                obj.pack_flags()
+            fields = [*fields, *(name for name in FLAG_FIELDS if name not in fields)]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        """
+        Set checkbox fields in the packed columns too, in the same UPDATE:
+        each touched section's ``*_flags`` keeps its other bits and has the
+        given ones set or cleared. Checkbox values must be plain booleans,
+        unless the section's ``*_flags`` is given as well (as bulk_update does).
+        """
+        for section, name in zip(SECTION_NAMES, FLAG_FIELDS):
+            if name in kwargs:
+                continue
+            given = [(bit, field) for bit, field in enumerate(SECTION_FIELDS[section]) if field in kwargs]
+            if not given:
+                continue
+            keep = (1 << len(SECTION_FIELDS[section])) - 1
+            bits = 0
+            for bit, field in given:
+                if not isinstance(kwargs[field], bool):
+                    raise TypeError(f"update() takes a plain True or False for {field}, not {kwargs[field]!r}.")
+                keep &= ~(1 << bit)
+                bits |= kwargs[field] << bit
+            kwargs[name] = models.F(name).bitand(keep).bitor(bits)
+        return super().update(**kwargs)
+
 
 class CQHEISurvey(models.Model):
     # ================= BASIC INFORMATION =================
@@ -108,13 +168,78 @@ class CQHEISurvey(models.Model):
     substrate_smaller_fist = models.BooleanField(default=False)
     substrate_smaller_fingernail = models.BooleanField(default=False)
 
+    # ================= PACKED SECTION FLAGS =================
+    # One bitmask per section (bit layout in rubric.SECTION_FIELDS), kept in
+    # sync with the checkboxes above on save and bulk_create.
+    section1_flags = models.PositiveIntegerField(default=0, editable=False)
+    section2_flags = models.PositiveIntegerField(default=0, editable=False)
+    section3_flags = models.PositiveIntegerField(default=0, editable=False)
+    section4_flags = models.PositiveIntegerField(default=0, editable=False)
+    section5_flags = models.PositiveIntegerField(default=0, editable=False)
+    section6_flags = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CQHEISurveyQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Compact mode: fill deferred checkboxes from the packed columns
+        # so reading them never costs a query per field.
+        if all(name in instance.__dict__ for name in FLAG_FIELDS):
+            codes = [instance.__dict__[name] for name in FLAG_FIELDS]
+            for field, value in unpack_sections(codes).items():
+                instance.__dict__.setdefault(field, value)
+        # Remember where the row was, so a save that moves it to another
+        # site can refresh the old site's summary too.
+        if all(name in instance.__dict__ for name in SITE_FIELDS):
+            instance._loaded_site = tuple(instance.__dict__[name] for name in SITE_FIELDS)
+        if all(name in instance.__dict__ for name in NAMED_SITE_FIELDS):
+            instance._loaded_named_site = tuple(instance.__dict__[name] for name in NAMED_SITE_FIELDS)
+        return instance
+
+    @property
+    def site_key(self):
+        # normalized like a loaded row, so '25.5' and Decimal('25.50') match
+        return tuple(self._meta.get_field(name).to_python(getattr(self, name)) for name in SITE_FIELDS)
+
+    @property
+    def named_site_key(self):
+        return tuple(getattr(self, name) for name in NAMED_SITE_FIELDS)
+
+    def pack_flags(self):
+        for name, code in zip(FLAG_FIELDS, pack_sections(self)):
+            setattr(self, name, code)
+
+    def save(self, *args, **kwargs):
+        if not self.get_deferred_fields().intersection(SCORE_FIELDS):
+            self.pack_flags()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and set(update_fields).intersection(SCORE_FIELDS):
+                kwargs['update_fields'] = set(update_fields).union(FLAG_FIELDS)
+        super().save(*args, **kwargs)
+
+    class Meta:
+        # Every lookup we serve filters on river_code / river_mile /
+        # survey_date / cluster_number / river_site; see benchmarks/query_lookups.py
+        indexes = [
+            # survey_list keyset pagination, newest first
+            models.Index(fields=['survey_date', 'id'], name='survey_date_id_idx'),
+            # survey_list filtered by river, then paged by date
+            models.Index(fields=['river_code', 'survey_date', 'id'], name='survey_code_date_idx'),
+            # one site (river + mile) over time
+            models.Index(fields=['river_code', 'river_mile', 'survey_date'], name='survey_code_mile_idx'),
+            # one named site over time
+            models.Index(fields=['river_code', 'river_site', 'survey_date'], name='survey_code_site_idx'),
+            models.Index(fields=['cluster_number'], name='survey_cluster_idx'),
+        ]
+
     # ==================================================
     # MODEL-LEVEL VALIDATION FOR "OTHER"
     # ==================================================
     def clean(self):
         if self.reach_length == "other" and not self.reach_length_custom:
             raise ValidationError({
-                "reach_length_custom": "Please specify the reach length when 'Other' is selected."
+                "reach_length_custom": OTHER_LENGTH_MODEL_ERROR
             })
 
         if self.reach_length != "other":
@@ -152,3 +277,50 @@ class Cover(models.Model):
     class Meta:
         db_table = 'cQHEI.Cover'
         managed = False
+        # Created by raw DDL in migration 0011 since the table is unmanaged
+        indexes = [
+            models.Index(fields=['cqhei_new_x_id'], name='cover_survey_idx'),
+        ]
+
+
+# =====================================================
+# PER-SITE AGGREGATES (maintained by summaries.py)
+# =====================================================
+
+class SiteSummary(models.Model):
+    river_code = models.CharField(max_length=50)
+    river_mile = models.DecimalField(max_digits=5, decimal_places=2)
+
+    survey_count = models.PositiveIntegerField(default=0)
+    cqhei_sum = models.FloatField(default=0)
+    cqhei_min = models.FloatField(null=True, blank=True)
+    cqhei_max = models.FloatField(null=True, blank=True)
+
+    # surveys at the site that have a cQHEI.Cover row
+    cover_count = models.PositiveIntegerField(default=0)
+    cover_sum = models.IntegerField(default=0)
+    cover_min = models.IntegerField(null=True, blank=True)
+    cover_max = models.IntegerField(null=True, blank=True)
+
+    latest_survey_id = models.BigIntegerField(null=True, blank=True)
+    latest_survey_date = models.DateField(null=True, blank=True)
+    latest_cqhei = models.FloatField(null=True, blank=True)
+    latest_cover_score = models.IntegerField(null=True, blank=True)
+
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['river_code', 'river_mile'], name='site_summary_site_uniq'),
+        ]
+
+    @property
+    def cqhei_mean(self):
+        return self.cqhei_sum / self.survey_count if self.survey_count else None
+
+    @property
+    def cover_mean(self):
+        return self.cover_sum / self.cover_count if self.cover_count else None
+
+    def __str__(self):
+        return f"{self.river_code} mile {self.river_mile} ({self.survey_count} surveys)"
@@ -0,0 +1,126 @@
+"""
+On-demand cProfile of single requests.
+
+A request is profiled when it carries ``PROFILE_TOKEN``, either as an
+``X-Profile: <token>`` header or a ``?profile=<token>`` query flag, and,
+with ``PROFILE_SAMPLE_EVERY = N``, every Nth survey_form POST a worker
+handles. The profile is saved to ``PROFILE_DIR`` as a pstats file, of
+which only the ``PROFILE_KEEP`` newest are kept, and the response gets an
+``X-Profile`` header linking to its report (``/profiles/<name>/``: the top
+functions by cumulative time as text; ``?download=1`` for the raw file,
+for snakeviz and the like). The report needs the token too.
+
+Everything is off unless a token or a sample rate is set (see
+settings.py); the middleware then raises MiddlewareNotUsed. What is
+profiled is the thread handling the request, from this middleware inward:
+a streaming response (the CSV export) stops at the point its body starts,
+and under ASGI the async views run outside it.
+"""
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve, reverse
+from django.utils.crypto import constant_time_compare
+
+# what a saved profile may be called, so a report URL cannot leave PROFILE_DIR
+NAME_RE = re.compile(r'^[\w.-]+\.prof$')
+
+REPORT_LINES = 60
+
+
+def authorized(request):
+    token = settings.PROFILE_TOKEN
+    if not token:
+        return False
+    given = request.headers.get('X-Profile') or request.GET.get('profile') or ''
+    return constant_time_compare(given, token)
+
+
+def profile_path(name):
+    """Return the path of the saved profile ``name``, or None."""
+    if not NAME_RE.match(name):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def save(profiler, route):
+    """Write ``profiler``'s stats to PROFILE_DIR, drop the oldest beyond PROFILE_KEEP; return the file name."""
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{route}-{uuid.uuid4().hex[:8]}.prof'
+    profiler.dump_stats(os.path.join(directory, name))
+
+    saved = sorted(
+        (entry for entry in os.scandir(directory) if NAME_RE.match(entry.name)),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in saved[:-settings.PROFILE_KEEP]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # another worker rotated it first
+    return name
+
+
+def report(path, lines=REPORT_LINES):
+    """The top ``lines`` functions of the profile at ``path``, by cumulative time."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(lines)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.sample_every = getattr(settings, 'PROFILE_SAMPLE_EVERY', 0)
+        if not getattr(settings, 'PROFILE_TOKEN', '') and not self.sample_every:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.posts = itertools.count(1)
+
+    def route(self, request):
+        try:
+            return resolve(request.path_info).url_name or 'unmatched'
+        except Resolver404:
+            return 'unmatched'
+
+    def sampled(self, request, route):
+        return (
+            self.sample_every
+            and request.method == 'POST'
+            and route == 'survey_form'
+            and next(self.posts) % self.sample_every == 0
+        )
+
+    def __call__(self, request):
+        requested = authorized(request)
+        if not requested and not (self.sample_every and request.method == 'POST'):
+            return self.get_response(request)
+        route = self.route(request)
+        if not requested and not self.sampled(request, route):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is already running in this process (3.12+)
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+
+        name = save(profiler, route)
+        response['X-Profile'] = request.build_absolute_uri(reverse('profile_report', args=[name]))
+        return response
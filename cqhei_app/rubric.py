@@ -0,0 +1,247 @@
+"""
+cQHEI rubric: the checkbox groups stored on CQHEISurvey and the points
+printed next to each option in templates/survey_form.html.
+
+This module is plain data (plus the bit layout used to pack a section's
+checkboxes into one integer) so models, forms and the scoring engine can
+all share it without pulling in NumPy or the ORM.
+"""
+
+# "Check 1 or Check 2 and Average": a group scores the mean of its checked options
+SINGLE = 'single'
+# "Check All that Apply" / "Check ALL ...": a group scores the sum of its checked options
+MULTI = 'multi'
+
+
+SECTIONS = [
+    {
+        'name': 'section1',
+        'title': 'I. Substrate',
+        'groups': [
+            {
+                'name': 'substrate_size',
+                'kind': SINGLE,
+                'options': [
+                    ('substrate_mostly_large', 14),
+                    ('substrate_mostly_medium', 10),
+                    ('substrate_mostly_small', 6),
+                    ('substrate_dominated_bedrock', 3),
+                    ('substrate_mostly_very_fine', 0),
+                ],
+            },
+            {
+                'name': 'smothering',
+                'kind': SINGLE,
+                'options': [
+                    ('smothering_no', 10),
+                    ('smothering_yes', 0),
+                ],
+            },
+            {
+                'name': 'silting',
+                'kind': SINGLE,
+                'options': [
+                    ('silting_no', 10),
+                    ('silting_yes', 0),
+                ],
+            },
+        ],
+    },
+    {
+        'name': 'section2',
+        'title': 'II. Fish Cover',
+        'groups': [
+            {
+                'name': 'cover',
+                'kind': MULTI,
+                'options': [
+                    ('cover_underwater_tree_roots_large', 2),
+                    ('cover_underwater_tree_rootlets', 2),
+                    ('cover_boulders', 2),
+                    ('cover_backwaters', 2),
+                    ('cover_downed_trees', 2),
+                    ('cover_deep_areas', 2),
+                    ('cover_undercut_banks', 2),
+                    ('cover_water_plants', 2),
+                    ('cover_shallow_slow_areas', 2),
+                    ('cover_shrubs_small_trees', 2),
+                ],
+            },
+        ],
+    },
+    {
+        'name': 'section3',
+        'title': 'III. Stream Shape and Human Alterations',
+        'groups': [
+            {
+                'name': 'curviness',
+                'kind': SINGLE,
+                'options': [
+                    ('curviness_two_plus_good_bends', 9),
+                    ('curviness_one_two_good_bends', 6),
+                    ('curviness_mostly_straight', 3),
+                    ('curviness_very_straight', 0),
+                ],
+            },
+            {
+                'name': 'natural',
+                'kind': SINGLE,
+                'options': [
+                    ('natural_mostly_natural', 12),
+                    ('natural_minor_changes', 9),
+                    ('natural_many_changes', 6),
+                    ('natural_heavy_changes', 0),
+                ],
+            },
+        ],
+    },
+    {
+        'name': 'section4',
+        'title': 'IV. Stream Forests & Wetlands & Erosion',
+        'groups': [
+            {
+                'name': 'width',
+                'kind': SINGLE,
+                'options': [
+                    ('width_wide', 9),
+                    ('width_narrow', 5),
+                    ('width_none', 0),
+                ],
+            },
+            {
+                'name': 'landuse',
+                'kind': SINGLE,
+                'options': [
+                    ('landuse_forest_wetland', 5),
+                    ('landuse_shrubs', 4),
+                    ('landuse_overgrown_fields', 3),
+                    ('landuse_fenced_pasture', 2),
+                    ('landuse_park', 2),
+                    ('landuse_conservation_tillage', 2),
+                ],
+            },
+            {
+                'name': 'erosion',
+                'kind': SINGLE,
+                'options': [
+                    ('erosion_urban_industrial', 4),
+                    ('erosion_open_pasture', 2),
+                    ('erosion_suburban_rowcrop', 0),
+                    ('erosion_raw_collapsing', 0),
+                ],
+            },
+            {
+                'name': 'shading',
+                'kind': SINGLE,
+                'options': [
+                    ('shading_mostly', 3),
+                    ('shading_partly', 2),
+                    ('shading_none', 0),
+                ],
+            },
+        ],
+    },
+    {
+        'name': 'section5',
+        'title': 'V. Depth & Current Velocity',
+        'groups': [
+            {
+                'name': 'depth',
+                'kind': SINGLE,
+                'options': [
+                    ('depth_chest_deep', 8),
+                    ('depth_waist_deep', 6),
+                    ('depth_knee_deep', 4),
+                    ('depth_ankle_deep', 0),
+                ],
+            },
+            {
+                'name': 'flow',
+                'kind': MULTI,
+                'options': [
+                    ('flow_very_fast', 2),
+                    ('flow_fast', 3),
+                    ('flow_moderate', 1),
+                    ('flow_slow', 1),
+                    ('flow_none', 0),
+                ],
+            },
+        ],
+    },
+    {
+        'name': 'section6',
+        'title': 'VI. Riffles/Runs',
+        'groups': [
+            {
+                'name': 'riffles',
+                'kind': SINGLE,
+                'options': [
+                    ('riffles_knee_deep_fast', 8),
+                    ('riffles_ankle_calf_fast', 6),
+                    ('riffles_ankle_shallow_slow', 4),
+                    ('riffles_none', 0),
+                ],
+            },
+            {
+                'name': 'riffle_substrate',
+                'kind': SINGLE,
+                'options': [
+                    ('substrate_fist_size', 7),
+                    ('substrate_smaller_fist', 4),
+                    ('substrate_smaller_fingernail', 0),
+                ],
+            },
+        ],
+    },
+]
+
+SECTION_NAMES = [section['name'] for section in SECTIONS]
+
+# Scored fields per section; field i of a section is bit i of its bitmask
+SECTION_FIELDS = {
+    section['name']: [field for group in section['groups'] for field, _points in group['options']]
+    for section in SECTIONS
+}
+
+# Integer columns on CQHEISurvey holding each section's packed bitmask
+FLAG_FIELDS = [f'{name}_flags' for name in SECTION_NAMES]
+
+# Every scored BooleanField on CQHEISurvey, in rubric order
+SCORE_FIELDS = [
+    field
+    for section in SECTIONS
+    for group in section['groups']
+    for field, _points in group['options']
+]
+
+
+def pack_sections(survey):
+    """
+    Pack a survey's checkboxes into one bitmask per section.
+
+    ``survey`` is a CQHEISurvey instance or a dict such as
+    ``form.cleaned_data``. Returns a list of ints in SECTION_NAMES order.
+    """
+    if isinstance(survey, dict):
+        get = survey.get
+    else:
+        def get(field):
+            return getattr(survey, field)
+
+    codes = []
+    for name in SECTION_NAMES:
+        code = 0
+        for bit, field in enumerate(SECTION_FIELDS[name]):
+            if get(field):
+                code |= 1 << bit
+        codes.append(code)
+    return codes
+
+
+def unpack_sections(codes):
+    """Inverse of pack_sections: return a dict of field -> bool."""
+    values = {}
+    for name, code in zip(SECTION_NAMES, codes):
+        for bit, field in enumerate(SECTION_FIELDS[name]):
+            values[field] = bool(code >> bit & 1)
+    return values
@@ -0,0 +1,154 @@
+"""
+Vectorized cQHEI scoring.
+
+Each section's checkboxes are packed into a bitmask (see
+rubric.pack_sections) and its score is looked up in a table precomputed
+for every possible combination of that section's boxes, including the
+"Check 1 or Check 2 and Average" rule. Scoring a survey is then one array
+index per section, and scoring the whole archive is six fancy-indexes over
+a (n_surveys, n_sections) code matrix.
+"""
+from itertools import islice
+
+import numpy as np
+
+from .metrics import count_scores
+from .rubric import (
+    FLAG_FIELDS, SECTIONS, SECTION_NAMES, SECTION_FIELDS, SCORE_FIELDS, SINGLE, pack_sections,
+)
+
+FIELD_INDEX = {field: i for i, field in enumerate(SCORE_FIELDS)}
+
+# Columns of SCORE_FIELDS that make up each section, in bit order
+SECTION_COLUMNS = [
+    np.array([FIELD_INDEX[field] for field in SECTION_FIELDS[name]], dtype=np.intp)
+    for name in SECTION_NAMES
+]
+
+
+def _score_groups(section, checked):
+    """
+    Score one section by walking its groups.
+
+    ``checked`` is a (n, n_section_fields) boolean matrix with columns in
+    the section's bit order. Only used to build the lookup tables.
+    """
+    earned = np.zeros(checked.shape[0], dtype=np.float64)
+    start = 0
+    for group in section['groups']:
+        points = np.array([p for _, p in group['options']], dtype=np.float64)
+        group_checked = checked[:, start:start + len(points)]
+        start += len(points)
+
+        group_earned = group_checked @ points
+        if group['kind'] == SINGLE:
+            # "Check 1 or Check 2 and Average"
+            n_checked = group_checked.sum(axis=1)
+            group_earned = np.divide(
+                group_earned, n_checked,
+                out=np.zeros_like(group_earned), where=n_checked > 0,
+            )
+        earned += group_earned
+    return earned
+
+
+def _build_table(section):
+    """Score every possible bitmask of ``section``."""
+    n_bits = len(SECTION_FIELDS[section['name']])
+    codes = np.arange(1 << n_bits, dtype=np.uint32)
+    checked = ((codes[:, None] >> np.arange(n_bits, dtype=np.uint32)) & 1).astype(bool)
+    return _score_groups(section, checked)
+
+
+# SECTION_TABLES[s][code] is the score of section s for bitmask ``code``
+SECTION_TABLES = [_build_table(section) for section in SECTIONS]
+
+
+def pack_matrix(matrix):
+    """
+    Pack a (n_surveys, len(SCORE_FIELDS)) boolean matrix into a
+    (n_surveys, n_sections) matrix of section bitmasks.
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    codes = np.empty((matrix.shape[0], len(SECTIONS)), dtype=np.uint32)
+    for s, columns in enumerate(SECTION_COLUMNS):
+        weights = np.uint32(1) << np.arange(len(columns), dtype=np.uint32)
+        codes[:, s] = matrix[:, columns].astype(np.uint32) @ weights
+    return codes
+
+
+def score_codes(codes):
+    """
+    Score a (n_surveys, n_sections) matrix of section bitmasks.
+
+    Returns a dict mapping each section name, plus 'total', to a float64
+    array of length n_surveys.
+    """
+    codes = np.asarray(codes)
+    count_scores('batch', len(codes))
+    scores = {name: SECTION_TABLES[s][codes[:, s]] for s, name in enumerate(SECTION_NAMES)}
+    scores['total'] = sum(scores[name] for name in SECTION_NAMES)
+    return scores
+
+
+def score_matrix(matrix):
+    """
+    Score a (n_surveys, len(SCORE_FIELDS)) boolean matrix.
+
+    Returns a dict mapping each section name, plus 'total', to a float64
+    array of length n_surveys.
+    """
+    return score_codes(pack_matrix(matrix))
+
+
+def _read_columns(queryset, columns, dtype, chunk_size):
+    """
+    Stream ``id`` plus ``columns`` of every row in ``queryset`` into
+    ``(ids, matrix)``, converting chunk by chunk so only the compact
+    NumPy arrays are held in memory.
+    """
+    rows = queryset.values_list('id', *columns).iterator(chunk_size=chunk_size)
+
+    id_chunks, matrix_chunks = [], []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        block = np.array(chunk, dtype=np.int64)
+        id_chunks.append(block[:, 0])
+        matrix_chunks.append(block[:, 1:].astype(dtype))
+
+    if not id_chunks:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(columns)), dtype=dtype)
+    return np.concatenate(id_chunks), np.concatenate(matrix_chunks)
+
+
+def survey_matrix(queryset, chunk_size=5000):
+    """Return ``(ids, matrix)`` of the scored checkbox columns in ``queryset``."""
+    return _read_columns(queryset, SCORE_FIELDS, bool, chunk_size)
+
+
+def survey_codes(queryset, chunk_size=5000):
+    """
+    Return ``(ids, codes)`` read straight from the packed ``*_flags``
+    columns: six integers per row instead of ~60 checkboxes.
+    """
+    return _read_columns(queryset, FLAG_FIELDS, np.uint32, chunk_size)
+
+
+def score_queryset(queryset, chunk_size=5000):
+    """Return ``(ids, scores)`` for every survey in ``queryset``."""
+    ids, codes = survey_codes(queryset, chunk_size=chunk_size)
+    return ids, score_codes(codes)
+
+
+def score_survey(survey):
+    """
+    Score one survey, given as a CQHEISurvey instance or a dict such as
+    ``form.cleaned_data``. Returns a dict of floats keyed like score_codes.
+    """
+    codes = pack_sections(survey)
+    count_scores('single')
+    scores = {name: float(SECTION_TABLES[s][codes[s]]) for s, name in enumerate(SECTION_NAMES)}
+    scores['total'] = sum(scores[name] for name in SECTION_NAMES)
+    return scores
@@ -0,0 +1,105 @@
+"""
+Score history of one named site (river_code + river_site) as a columnar
+JSON payload, served from the ``series`` cache.
+
+That cache is a table in the database (see settings.py), so every worker
+process and management command shares one copy of each payload and one
+version per site: a write anywhere invalidates it for all of them. The
+encoded payload is cached per site until a survey at that site is written
+(see signals.py and the importer), so repeat views of a site are one
+cache read with no survey query and no JSON encoding.
+
+A write does not delete the payload but moves the site to a new cache
+version once it commits. The payload is stored with the version read
+before its rows were queried, so one built from rows read before the
+commit is stale by its own tag and never served.
+"""
+import hashlib
+import json
+import uuid
+
+import numpy as np
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import CQHEISurvey
+from .rubric import FLAG_FIELDS, SECTION_NAMES
+from .scoring import score_codes
+
+# Invalidation is explicit; the timeout only bounds how long a write made
+# behind the ORM's back (raw SQL, another app) can go unnoticed.
+SERIES_CACHE_TIMEOUT = 60 * 60 * 24
+
+# the CACHES alias; it must be shared by every process
+SERIES_CACHE = 'series'
+
+
+def cache_key(river_code, river_site):
+    # hashed: site names hold spaces and punctuation memcached rejects
+    digest = hashlib.sha1(f'{river_code}\0{river_site}'.encode()).hexdigest()
+    return f'cqhei:site-series:{digest}'
+
+
+def version_key(river_code, river_site):
+    return f'{cache_key(river_code, river_site)}:version'
+
+
+def build_series(river_code, river_site):
+    """
+    Return the site's surveys, oldest first, as parallel arrays::
+
+        {"river_code": ..., "river_site": ..., "ids": [...], "dates": [...],
+         "miles": [...], "section1": [...], ..., "section6": [...], "total": [...]}
+    """
+    rows = list(
+        CQHEISurvey.objects
+        .filter(river_code=river_code, river_site=river_site)
+        .order_by('survey_date', 'id')
+        .values_list('id', 'survey_date', 'river_mile', *FLAG_FIELDS)
+    )
+    codes = np.array([row[3:] for row in rows], dtype=np.uint32).reshape(len(rows), len(FLAG_FIELDS))
+    scores = score_codes(codes)
+
+    series = {
+        'river_code': river_code,
+        'river_site': river_site,
+        'ids': [row[0] for row in rows],
+        'dates': [row[1].isoformat() for row in rows],
+        'miles': [float(row[2]) for row in rows],
+    }
+    for name in [*SECTION_NAMES, 'total']:
+        series[name] = scores[name].tolist()
+    return series
+
+
+def series_json(river_code, river_site):
+    """The encoded payload of ``build_series``, from the cache when it is current."""
+    cache = caches[SERIES_CACHE]
+    key = cache_key(river_code, river_site)
+    vkey = version_key(river_code, river_site)
+    # one round trip for the site's version and its payload, which is
+    # stored as (version it was built at, payload)
+    cached = cache.get_many([vkey, key])
+    version = cached.get(vkey)
+    if version is None:
+        # random, so an evicted version never comes back to old payloads
+        cache.add(vkey, uuid.uuid4().hex, SERIES_CACHE_TIMEOUT)
+        version = cache.get(vkey)
+    entry = cached.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    payload = json.dumps(build_series(river_code, river_site), separators=(',', ':'))
+    cache.set(key, (version, payload), SERIES_CACHE_TIMEOUT)
+    return payload
+
+
+def invalidate(sites):
+    """
+    Move ``sites`` (``(river_code, river_site)`` pairs) to a new cache
+    version once the current transaction commits.
+    """
+    keys = [version_key(*site) for site in set(sites)]
+    if keys:
+        transaction.on_commit(lambda: caches[SERIES_CACHE].set_many(
+            {key: uuid.uuid4().hex for key in keys}, SERIES_CACHE_TIMEOUT,
+        ))
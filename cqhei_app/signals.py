@@ -0,0 +1,59 @@
+"""
+Keep SiteSummary and the cached site time series in step with
+CQHEISurvey and cQHEI.Cover writes.
+
+Connected in CqheiAppConfig.ready().
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import series, summaries
+from .covers import cover_written
+from .models import Cover, CQHEISurvey
+
+
+@receiver(post_save, sender=CQHEISurvey)
+def survey_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    named_sites = {instance.named_site_key}
+    loaded = getattr(instance, '_loaded_named_site', None)
+    if loaded is not None:
+        named_sites.add(loaded)
+    series.invalidate(named_sites)
+    instance._loaded_named_site = instance.named_site_key
+
+    if created:
+        summaries.add_surveys([instance])
+        return
+    # an edit can lower a min/max or move the survey to another site
+    sites = {instance.site_key}
+    loaded = getattr(instance, '_loaded_site', None)
+    if loaded is not None:
+        sites.add(loaded)
+    summaries.refresh_sites(sites)
+    instance._loaded_site = instance.site_key
+
+
+@receiver(post_delete, sender=CQHEISurvey)
+def survey_deleted(sender, instance, **kwargs):
+    series.invalidate([instance.named_site_key])
+    summaries.refresh_sites([instance.site_key])
+
+
+@receiver(cover_written)
+def covers_written(sender, scores, created=True, has_survey=True, **kwargs):
+    if not has_survey:
+        # no site to fold the score into
+        return
+    if created:
+        summaries.add_covers(scores)
+    else:
+        summaries.refresh_sites(summaries.sites_for_surveys(scores))
+
+
+@receiver(post_save, sender=Cover)
+@receiver(post_delete, sender=Cover)
+def cover_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        summaries.refresh_sites(summaries.sites_for_surveys([instance.cqhei_new_x_id]))
@@ -0,0 +1,178 @@
+"""
+Slow-query capture.
+
+With ``SLOW_QUERY_LOG`` on, every database connection gets an execute
+wrapper that times each statement and counts it under its fingerprint:
+the SQL with literals and placeholders replaced by ``?`` and ``IN (...)``
+lists collapsed, so the 1-row and the 500-row lookup of the same pattern
+are counted together. Statements slower than ``SLOW_QUERY_MS`` are logged
+as one JSON line on the ``cqhei_app.slow_queries`` logger with their
+parameters, the cqhei_app line that ran them and the database's plan
+(``EXPLAIN QUERY PLAN`` on SQLite, ``SET SHOWPLAN_TEXT`` on SQL Server):
+
+    >>> slow_queries.stats()[0]
+    {'fingerprint': 'SELECT ... FROM "cqhei_app_cqheisurvey" WHERE "river_code" = ? ...',
+     'count': 310, 'slow': 4, 'total_ms': 912.4, 'max_ms': 61.0}
+
+The fingerprints are per process. Connected in CqheiAppConfig.ready().
+"""
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+THIS_FILE = os.path.abspath(__file__)
+APP_DIR = os.path.dirname(THIS_FILE)
+
+# statements worth a plan; PRAGMA, SAVEPOINT and the like are not
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w"\]])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_LIST = re.compile(r'\(\?(?:, ?\?)*\)')
+_ROWS = re.compile(r'\(\.\.\.\)(?:, ?\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+# savepoint names are unique per use
+_SAVEPOINT = re.compile(r'\b(SAVEPOINT|SAVE TRANSACTION|ROLLBACK TRANSACTION) \S+')
+
+_lock = threading.Lock()
+_fingerprints = {}
+_local = threading.local()
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """``sql`` with its literals, placeholders and IN/VALUES lists normalized."""
+    sql = _SPACE.sub(' ', sql.strip())
+    sql = _SAVEPOINT.sub(r'\1 ?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _ROWS.sub('(...), ...', sql)
+
+
+def call_site():
+    """``file.py:line in function`` of the innermost cqhei_app frame outside this module."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(APP_DIR) and filename != THIS_FILE:
+            return f'{os.path.relpath(filename, os.path.dirname(APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def explain(connection, sql, params):
+    """The database's plan for ``sql`` as a list of lines, or None if it cannot give one."""
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[-1] for row in cursor.fetchall()]
+            if connection.vendor == 'microsoft':
+                # the statement is compiled, not run, while SHOWPLAN is on
+                cursor.execute('SET SHOWPLAN_TEXT ON')
+                try:
+                    cursor.execute(sql, params)
+                    lines = []
+                    while True:
+                        lines.extend(row[0] for row in cursor.fetchall())
+                        if not cursor.nextset():
+                            break
+                    return lines
+                finally:
+                    cursor.execute('SET SHOWPLAN_TEXT OFF')
+            return None
+    except DatabaseError as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        _local.explaining = False
+
+
+def record(sql, ms, slow):
+    key = fingerprint(sql)
+    with _lock:
+        entry = _fingerprints.get(key)
+        if entry is None:
+            entry = _fingerprints[key] = {'count': 0, 'slow': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        entry['count'] += 1
+        entry['slow'] += slow
+        entry['total_ms'] += ms
+        if ms > entry['max_ms']:
+            entry['max_ms'] = ms
+    return key
+
+
+class SlowQueryWrapper:
+    """connection.execute_wrapper hook; one is shared by every connection."""
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            slow = ms >= settings.SLOW_QUERY_MS
+            key = record(sql, ms, slow)
+            if slow:
+                self.log(context['connection'], sql, params, many, ms, key)
+
+    def log(self, connection, sql, params, many, ms, key):
+        plan = None
+        if settings.SLOW_QUERY_EXPLAIN and not many:
+            plan = explain(connection, sql, params)
+        logger.warning(json.dumps({
+            'event': 'slow_query',
+            'ms': round(ms, 3),
+            'alias': connection.alias,
+            'sql': sql,
+            'params': params if not many else '<executemany>',
+            'call_site': call_site(),
+            'fingerprint': key,
+            'plan': plan,
+        }, default=str))
+
+
+wrapper = SlowQueryWrapper()
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    if getattr(settings, 'SLOW_QUERY_LOG', False) and wrapper not in connection.execute_wrappers:
+        # first, not last: the connection usually opens inside a request, and
+        # the middlewares' execute_wrapper() blocks pop the last one on exit
+        connection.execute_wrappers.insert(0, wrapper)
+
+
+def stats(top=None):
+    """Query fingerprints seen by this process, by total time, longest first."""
+    with _lock:
+        entries = [
+            {'fingerprint': key, **entry, 'total_ms': round(entry['total_ms'], 3), 'max_ms': round(entry['max_ms'], 3)}
+            for key, entry in _fingerprints.items()
+        ]
+    entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return entries[:top]
+
+
+def reset():
+    with _lock:
+        _fingerprints.clear()
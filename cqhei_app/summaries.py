@@ -0,0 +1,293 @@
+"""
+Per-site aggregates kept in SiteSummary.
+
+A site is a river_code + river_mile pair. Every save or delete of a survey
+or of its cQHEI.Cover row updates the affected summaries (see signals.py):
+
+* a new survey or a survey's first Cover row is folded in with one
+  UPDATE of running totals (add_surveys / add_covers);
+* anything that can lower a min/max or change the latest survey, such as
+  an edited or deleted survey or a Cover row replacing an older one,
+  recomputes just that site (refresh_sites).
+
+Bulk writes that bypass model signals (``bulk_create``) must call
+add_surveys themselves; the importer does. ``rebuild`` recomputes every
+summary from scratch and reports drift; it backs the
+``rebuild_site_summaries`` management command.
+"""
+import datetime
+import math
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .covers import cover_count_sql, cover_scores
+from .models import SITE_FIELDS, CQHEISurvey, SiteSummary
+from .rubric import FLAG_FIELDS
+from .scoring import score_codes, score_survey
+
+
+def _site_filter(keys):
+    return reduce(or_, (Q(**dict(zip(SITE_FIELDS, key))) for key in keys))
+
+
+def _running_min(field, value):
+    # NULL (an empty summary) compares false, so it takes the new value
+    return Case(When(**{f'{field}__lte': value}, then=F(field)), default=Value(value))
+
+
+def _running_max(field, value):
+    return Case(When(**{f'{field}__gte': value}, then=F(field)), default=Value(value))
+
+
+def _is_older(survey_date, survey_id):
+    """Summaries whose latest survey comes before (survey_date, survey_id)."""
+    return (
+        Q(latest_survey_date__isnull=True)
+        | Q(latest_survey_date__lt=survey_date)
+        | Q(latest_survey_date=survey_date, latest_survey_id__lt=survey_id)
+    )
+
+
+def _update_or_insert(key, updates, create):
+    """
+    Apply ``updates`` to the summary of ``key``, creating it from
+    ``create`` when missing. A concurrent creator makes the INSERT fail,
+    in which case the UPDATE is retried.
+    """
+    site = dict(zip(SITE_FIELDS, key))
+    if SiteSummary.objects.filter(**site).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            SiteSummary.objects.create(**site, **create)
+    except IntegrityError:
+        SiteSummary.objects.filter(**site).update(**updates)
+
+
+# ============================
+# Incremental updates
+# ============================
+
+def add_surveys(surveys):
+    """Fold newly created surveys into their site summaries."""
+    by_site = {}
+    for survey in surveys:
+        by_site.setdefault(survey.site_key, []).append(survey)
+
+    for key, group in by_site.items():
+        totals = [score_survey(survey)['total'] for survey in group]
+        latest, latest_total = max(zip(group, totals), key=lambda pair: (pair[0].survey_date, pair[0].pk))
+        site = dict(zip(SITE_FIELDS, key))
+
+        with transaction.atomic():
+            _update_or_insert(
+                key,
+                updates={
+                    'survey_count': F('survey_count') + len(group),
+                    'cqhei_sum': F('cqhei_sum') + sum(totals),
+                    'cqhei_min': _running_min('cqhei_min', min(totals)),
+                    'cqhei_max': _running_max('cqhei_max', max(totals)),
+                },
+                create={
+                    'survey_count': len(group),
+                    'cqhei_sum': sum(totals),
+                    'cqhei_min': min(totals),
+                    'cqhei_max': max(totals),
+                },
+            )
+            # the new latest survey has no Cover row yet
+            SiteSummary.objects.filter(_is_older(latest.survey_date, latest.pk), **site).update(
+                latest_survey_id=latest.pk,
+                latest_survey_date=latest.survey_date,
+                latest_cqhei=latest_total,
+                latest_cover_score=None,
+            )
+
+
+def add_covers(scores):
+    """
+    Fold newly inserted Cover rows, ``{cqhei_new_x_id: cover_score}``,
+    into the summaries of their surveys' sites.
+
+    A survey keeps only its newest Cover row, so a site where one of them
+    already had a row is recomputed instead (refresh_sites).
+    """
+    rows = (
+        CQHEISurvey.objects.filter(pk__in=list(scores))
+        .annotate(cover_rows=RawSQL(cover_count_sql(), [], output_field=IntegerField()))
+        .values_list('pk', 'cover_rows', *SITE_FIELDS)
+    )
+    by_site = {}
+    replaced = set()
+    for pk, cover_rows, *key in rows:
+        by_site.setdefault(tuple(key), []).append(pk)
+        if cover_rows > 1:
+            replaced.add(tuple(key))
+    refresh_sites(replaced)
+    for key in replaced:
+        del by_site[key]
+
+    for key, ids in by_site.items():
+        values = [scores[pk] for pk in ids]
+        site = dict(zip(SITE_FIELDS, key))
+        with transaction.atomic():
+            SiteSummary.objects.filter(**site).update(
+                cover_count=F('cover_count') + len(values),
+                cover_sum=F('cover_sum') + sum(values),
+                cover_min=_running_min('cover_min', min(values)),
+                cover_max=_running_max('cover_max', max(values)),
+                latest_cover_score=Case(
+                    *(When(latest_survey_id=pk, then=Value(scores[pk])) for pk in ids),
+                    default=F('latest_cover_score'),
+                ),
+            )
+
+
+# ============================
+# Recomputing
+# ============================
+
+def _aggregate(queryset, chunk_size=5000):
+    """
+    Compute the SiteSummary statistics of every site in ``queryset``.
+
+    Returns ``{site_key: {stat: value}}``.
+    """
+    rows = queryset.values_list('id', 'survey_date', *SITE_FIELDS, *FLAG_FIELDS).iterator(chunk_size=chunk_size)
+    n_site = len(SITE_FIELDS)
+
+    sites = {}
+    id_chunks, date_chunks, site_chunks, code_chunks = [], [], [], []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        id_chunks.append(np.array([row[0] for row in chunk], dtype=np.int64))
+        date_chunks.append(np.array([row[1].toordinal() for row in chunk], dtype=np.int64))
+        site_chunks.append(np.array(
+            [sites.setdefault(tuple(row[2:2 + n_site]), len(sites)) for row in chunk], dtype=np.int64,
+        ))
+        code_chunks.append(np.array([row[2 + n_site:] for row in chunk], dtype=np.uint32))
+    if not sites:
+        return {}
+
+    ids = np.concatenate(id_chunks)
+    dates = np.concatenate(date_chunks)
+    site_index = np.concatenate(site_chunks)
+    totals = score_codes(np.concatenate(code_chunks))['total']
+
+    covers = cover_scores(ids.tolist())
+    cover = np.array([covers.get(pk, np.nan) for pk in ids.tolist()], dtype=np.float64)
+    has_cover = ~np.isnan(cover)
+
+    n = len(sites)
+    count = np.bincount(site_index, minlength=n)
+    cqhei_sum = np.bincount(site_index, weights=totals, minlength=n)
+    cqhei_min = np.full(n, np.inf)
+    cqhei_max = np.full(n, -np.inf)
+    np.minimum.at(cqhei_min, site_index, totals)
+    np.maximum.at(cqhei_max, site_index, totals)
+
+    cover_index = site_index[has_cover]
+    cover_values = cover[has_cover]
+    cover_count = np.bincount(cover_index, minlength=n)
+    cover_sum = np.bincount(cover_index, weights=cover_values, minlength=n)
+    cover_min = np.full(n, np.inf)
+    cover_max = np.full(n, -np.inf)
+    np.minimum.at(cover_min, cover_index, cover_values)
+    np.maximum.at(cover_max, cover_index, cover_values)
+
+    # latest survey per site: the last row of each site in (date, id) order
+    order = np.lexsort((ids, dates, site_index))
+    last = order[np.r_[site_index[order][1:] != site_index[order][:-1], True]]
+
+    stats = {}
+    for key, s in sites.items():
+        row = last[s]
+        has = bool(cover_count[s])
+        stats[key] = {
+            'survey_count': int(count[s]),
+            'cqhei_sum': float(cqhei_sum[s]),
+            'cqhei_min': float(cqhei_min[s]),
+            'cqhei_max': float(cqhei_max[s]),
+            'cover_count': int(cover_count[s]),
+            'cover_sum': int(cover_sum[s]),
+            'cover_min': int(cover_min[s]) if has else None,
+            'cover_max': int(cover_max[s]) if has else None,
+            'latest_survey_id': int(ids[row]),
+            'latest_survey_date': datetime.date.fromordinal(int(dates[row])),
+            'latest_cqhei': float(totals[row]),
+            'latest_cover_score': None if np.isnan(cover[row]) else int(cover[row]),
+        }
+    return stats
+
+
+def sites_for_surveys(survey_ids):
+    """Site keys of the given surveys."""
+    return set(
+        CQHEISurvey.objects.filter(pk__in=list(survey_ids)).values_list(*SITE_FIELDS).distinct()
+    )
+
+
+def refresh_sites(keys):
+    """Recompute the summaries of ``keys`` from their surveys."""
+    keys = set(keys)
+    if not keys:
+        return
+    stats = _aggregate(CQHEISurvey.objects.filter(_site_filter(keys)))
+    with transaction.atomic():
+        for key in keys:
+            site = dict(zip(SITE_FIELDS, key))
+            if key in stats:
+                SiteSummary.objects.update_or_create(**site, defaults=stats[key])
+            else:
+                SiteSummary.objects.filter(**site).delete()
+
+
+def _differs(expected, actual):
+    if isinstance(expected, float) and isinstance(actual, float):
+        return not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-6)
+    return expected != actual
+
+
+def rebuild(check=False):
+    """
+    Recompute every site summary from the survey and Cover tables.
+
+    Returns a list of ``{'site': key, 'field': ..., 'expected': ...,
+    'actual': ...}`` entries for every stored value that had drifted
+    (``field`` is None for a missing or stale summary row). With
+    ``check=True`` nothing is written.
+    """
+    stats = _aggregate(CQHEISurvey.objects.all())
+    stored = {
+        tuple(getattr(summary, name) for name in SITE_FIELDS): summary
+        for summary in SiteSummary.objects.all()
+    }
+
+    drift = []
+    for key, expected in stats.items():
+        summary = stored.get(key)
+        if summary is None:
+            drift.append({'site': key, 'field': None, 'expected': 'row', 'actual': None})
+            continue
+        for field, value in expected.items():
+            actual = getattr(summary, field)
+            if _differs(value, actual):
+                drift.append({'site': key, 'field': field, 'expected': value, 'actual': actual})
+    for key in stored.keys() - stats.keys():
+        drift.append({'site': key, 'field': None, 'expected': None, 'actual': 'row'})
+
+    if not check:
+        with transaction.atomic():
+            SiteSummary.objects.all().delete()
+            SiteSummary.objects.bulk_create(
+                SiteSummary(**dict(zip(SITE_FIELDS, key)), **values) for key, values in stats.items()
+            )
+    return drift
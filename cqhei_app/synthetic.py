@@ -0,0 +1,275 @@
+"""
+Synthetic surveys for load and scale testing, backing the
+``generate_surveys`` management command and benchmarks/.
+
+Every batch is drawn with NumPy from one seeded generator, so the same
+seed always gives the same rows. The rows pass CQHEISurveyForm's rules:
+at most one box per single-choice group, river miles within 0-999.99,
+only REACH_LENGTH_CHOICES (with a custom length whenever "other" is
+picked) and dates in the past. Each survey gets its cQHEI.Cover row.
+
+Binding ~80 values per row is what limits a plain executemany, so a
+batch is staged as ~15 integers per row: lookup indexes for the text
+columns and the packed section flags. SQLite then expands the stage into
+CQHEISurvey (joining the text lookups and unpacking each checkbox from
+its section's bitmask) and into cQHEI.Cover with one INSERT ... SELECT
+each. Survey ids are assigned here so the Cover rows can reference them
+without reading anything back; that and the PRAGMAs make this SQLite
+only, so synthetic data never goes near Azure SQL.
+"""
+import contextlib
+import datetime
+import time
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .covers import COVER_COLUMNS, INSERT_COLUMNS, cover_table
+from .models import CQHEISurvey
+from .rubric import FLAG_FIELDS, SCORE_FIELDS, SECTION_FIELDS, SECTION_NAMES, SECTIONS, SINGLE
+from .scoring import FIELD_INDEX, pack_matrix, score_codes
+
+DEFAULT_BATCH_SIZE = 100_000
+
+TEXT_FIELDS = [
+    'survey_date', 'river_code', 'river_mile', 'clarity', 'forest_ule_number',
+    'cluster_number', 'river_site', 'name_group', 'reach_length', 'reach_length_custom',
+]
+
+CLARITIES = ['clear', 'slightly turbid', 'turbid', '']
+CREWS = [f'Field Crew {letter}' for letter in 'ABCDEFGH']
+REACH_LENGTHS = [value for value, _ in CQHEISurvey.REACH_LENGTH_CHOICES]
+# index 0 is the blank every reach length but "other" gets
+CUSTOM_LENGTHS = ['', '80m', '120m', '300m', '1km']
+
+# single-choice groups as matrix columns; multi-select columns in one array
+SINGLE_GROUPS = [
+    np.array([FIELD_INDEX[field] for field, _ in group['options']])
+    for section in SECTIONS for group in section['groups'] if group['kind'] == SINGLE
+]
+MULTI_COLUMNS = np.array([
+    FIELD_INDEX[field]
+    for section in SECTIONS for group in section['groups'] if group['kind'] != SINGLE
+    for field, _ in group['options']
+])
+
+# checkbox -> SQL reading its bit from the staged section bitmask
+FLAG_BITS = {
+    field: f'(s.{flag} >> {bit}) & 1'
+    for name, flag in zip(SECTION_NAMES, FLAG_FIELDS)
+    for bit, field in enumerate(SECTION_FIELDS[name])
+}
+
+# staged integer columns: the survey id, lookup indexes, flags, cover score
+STAGE_COLUMNS = [
+    'id', 'day', 'site', 'clarity', 'cluster', 'crew', 'reach', 'custom',
+    *FLAG_FIELDS, 'cover_score',
+]
+LOOKUPS = ['day', 'clarity', 'crew', 'reach', 'custom']
+
+
+class SurveyGenerator:
+    """
+    Draws batches of surveys from a fixed seed.
+
+    Sites are ``rivers`` river codes with ``sites_per_river`` miles each;
+    a site's mile and name are fixed, so site and named-site lookups return
+    a realistic handful of rows. Dates fall within ``years`` before today.
+    """
+
+    def __init__(self, seed=0, rivers=200, sites_per_river=50, years=25):
+        self.rng = np.random.default_rng(seed)
+        today = timezone.now().date()
+        first = today - datetime.timedelta(days=365 * years)
+        self.lookups = {
+            'day': [(first + datetime.timedelta(days=d)).isoformat() for d in range((today - first).days)],
+            'clarity': CLARITIES,
+            'crew': CREWS,
+            'reach': REACH_LENGTHS,
+            'custom': CUSTOM_LENGTHS,
+        }
+        # sites every 2.5 miles up each river, capped at the form's 999.99
+        self.sites = [
+            (f'R{r:03d}', f'{min(s * 2.5, 999.99):.2f}', f'R{r:03d} site {s}')
+            for r in range(rivers) for s in range(sites_per_river)
+        ]
+        self.other = REACH_LENGTHS.index('other')
+
+    def checkboxes(self, n):
+        """An (n, len(SCORE_FIELDS)) matrix that respects every single-choice group."""
+        rng = self.rng
+        matrix = np.zeros((n, len(SCORE_FIELDS)), dtype=bool)
+        matrix[:, MULTI_COLUMNS] = rng.random((n, len(MULTI_COLUMNS))) < 0.4
+        rows = np.arange(n)
+        for cols in SINGLE_GROUPS:
+            # -1 leaves the group blank
+            pick = rng.integers(-1, len(cols), n)
+            ticked = pick >= 0
+            matrix[rows[ticked], cols[pick[ticked]]] = True
+        return matrix
+
+    def batch(self, n):
+        """
+        Return ``(columns, matrix)``: STAGE_COLUMNS lookup indexes (and the
+        cluster number) as int arrays of length n, and the checkbox matrix.
+        """
+        rng = self.rng
+        reach = rng.integers(0, len(REACH_LENGTHS), n)
+        custom = rng.integers(1, len(CUSTOM_LENGTHS), n)
+        custom[reach != self.other] = 0
+        columns = {
+            'day': rng.integers(0, len(self.lookups['day']), n),
+            'site': rng.integers(0, len(self.sites), n),
+            'clarity': rng.integers(0, len(CLARITIES), n),
+            'cluster': rng.integers(0, 1000, n),
+            'crew': rng.integers(0, len(CREWS), n),
+            'reach': reach,
+            'custom': custom,
+        }
+        return columns, self.checkboxes(n)
+
+
+def _columns(names):
+    return ', '.join(connection.ops.quote_name(name) for name in names)
+
+
+@contextlib.contextmanager
+def staging(generator):
+    """
+    Create the temporary stage and lookup tables for ``generator`` and
+    relax durability for the load: no fsync and an in-memory journal. A
+    crash mid-run can then corrupt the file, which is fine for a scratch
+    benchmark database.
+    """
+    # these PRAGMAs cannot change inside a transaction (e.g. in tests)
+    relax = not connection.in_atomic_block
+    with connection.cursor() as cursor:
+        if relax:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+            cursor.execute('PRAGMA temp_store = MEMORY')
+        cursor.execute('PRAGMA cache_size = -262144')
+        # lets the index rebuild sort on several cores
+        cursor.execute('PRAGMA threads = 4')
+
+        cursor.execute(f'CREATE TEMP TABLE synthetic_stage ({", ".join(f"{c} INTEGER" for c in STAGE_COLUMNS)})')
+        cursor.execute(
+            'CREATE TEMP TABLE synthetic_site '
+            '(i INTEGER PRIMARY KEY, river_code TEXT, river_mile TEXT, river_site TEXT)'
+        )
+        cursor.executemany(
+            'INSERT INTO synthetic_site VALUES (%s, %s, %s, %s)',
+            [(i, *site) for i, site in enumerate(generator.sites)],
+        )
+        for name in LOOKUPS:
+            cursor.execute(f'CREATE TEMP TABLE synthetic_{name} (i INTEGER PRIMARY KEY, value TEXT)')
+            cursor.executemany(
+                f'INSERT INTO synthetic_{name} VALUES (%s, %s)', list(enumerate(generator.lookups[name])),
+            )
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name in ['stage', 'site', *LOOKUPS]:
+                cursor.execute(f'DROP TABLE IF EXISTS temp.synthetic_{name}')
+            if relax:
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+                cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+
+
+@contextlib.contextmanager
+def deferred_indexes(table):
+    """Drop ``table``'s secondary indexes for the load and rebuild them after."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        for name, _sql in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _name, sql in indexes:
+                cursor.execute(sql)
+
+
+def _expand_sql():
+    survey_sql = (
+        f'INSERT INTO {connection.ops.quote_name(CQHEISurvey._meta.db_table)} '
+        f'({_columns(["id", *TEXT_FIELDS, *SCORE_FIELDS, *FLAG_FIELDS, "cover_score"])}) '
+        'SELECT s.id, day.value, site.river_code, site.river_mile, clarity.value, \'\', '
+        'CAST(s.cluster AS TEXT), site.river_site, crew.value, reach.value, custom.value, '
+        f'{", ".join(FLAG_BITS[field] for field in SCORE_FIELDS)}, '
+        f'{", ".join(f"s.{flag}" for flag in FLAG_FIELDS)}, s.cover_score '
+        'FROM temp.synthetic_stage s '
+        'JOIN temp.synthetic_site site ON site.i = s.site '
+        + ' '.join(f'JOIN temp.synthetic_{name} {name} ON {name}.i = s.{name}' for name in LOOKUPS)
+    )
+    cover_sql = (
+        f'INSERT INTO {cover_table()} ({", ".join(INSERT_COLUMNS)}) '
+        f'SELECT s.id, {", ".join(f"({FLAG_BITS[field]}) * 2" for field, _ in COVER_COLUMNS)}, %s, %s '
+        'FROM temp.synthetic_stage s'
+    )
+    return survey_sql, cover_sql
+
+
+def write_surveys(n, seed=0, batch_size=DEFAULT_BATCH_SIZE, covers=True, generator=None):
+    """
+    Insert ``n`` synthetic surveys (and their Cover rows unless ``covers``
+    is False), one transaction per batch. The survey table's secondary
+    indexes are rebuilt once at the end rather than maintained per row.
+
+    Returns ``{'rows': n, 'first_id': ..., 'seconds': ..., 'rows_per_sec': ...}``.
+    SiteSummary is not touched; rebuild it afterwards if it matters.
+    """
+    if connection.vendor != 'sqlite':
+        raise ValueError("Synthetic surveys can only be written to a SQLite database.")
+
+    generator = generator or SurveyGenerator(seed)
+    stage_sql = (
+        f'INSERT INTO temp.synthetic_stage VALUES ({", ".join(["%s"] * len(STAGE_COLUMNS))})'
+    )
+    survey_sql, cover_sql = _expand_sql()
+    now = timezone.now().isoformat()
+
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(CQHEISurvey._meta.db_table)}')
+        first_id = next_id = cursor.fetchone()[0] + 1
+
+    with staging(generator), deferred_indexes(CQHEISurvey._meta.db_table):
+        for offset in range(0, n, batch_size):
+            size = min(batch_size, n - offset)
+            columns, matrix = generator.batch(size)
+            codes = pack_matrix(matrix)
+            cover_scores = score_codes(codes)['section2'].astype(int)
+
+            rows = zip(
+                range(next_id, next_id + size),
+                *(columns[name].tolist() for name in STAGE_COLUMNS[1:8]),
+                *codes.T.tolist(),
+                cover_scores.tolist(),
+            )
+            next_id += size
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(stage_sql, rows)
+                cursor.execute(survey_sql)
+                if covers:
+                    cursor.execute(cover_sql, [now, now])
+                cursor.execute('DELETE FROM temp.synthetic_stage')
+
+    seconds = time.perf_counter() - started
+    return {
+        'rows': n,
+        'first_id': first_id,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(n / seconds, 1) if seconds else 0.0,
+    }
@@ -1,3 +1,1279 @@
-from django.test import TestCase
+import contextlib
+import csv
+import datetime
+import difflib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from prometheus_client import REGISTRY
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.utils import CursorWrapper
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+try:
+    import gunicorn
+except ImportError:  # not installed on Windows dev machines
+    gunicorn = None
+
+from .models import CQHEISurvey, SiteSummary
+from .rubric import SCORE_FIELDS, SECTIONS, SECTION_FIELDS, pack_sections
+from . import connections, series, slow_queries, urls, views
+from .covers import (
+    batch_size, cover_scores, cover_table, insert_cover, insert_covers, upsert_covers, with_cover_scores,
+)
+from .forms import CQHEISurveyForm
+from .importer import DEFAULT_CHUNK_SIZE, import_file, import_rows
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .scoring import (
+    FIELD_INDEX, _score_groups, pack_matrix, score_matrix, score_queryset, score_survey,
+    survey_matrix,
+)
+from .summaries import rebuild
+from .synthetic import SurveyGenerator, write_surveys
+from .validators import validate_batch, validate_row
+
+
+def make_survey(**kwargs):
+    values = {
+        'survey_date': datetime.date(2024, 6, 1),
+        'river_code': 'R01',
+        'river_mile': '12.50',
+        'river_site': 'Mill Creek at Route 9',
+        'name_group': 'Field Crew A',
+        'reach_length': '100m',
+    }
+    values.update(kwargs)
+    return CQHEISurvey(**values)
+
+
+class ScoringTests(SimpleTestCase):
+
+    def test_single_survey_matches_points_table(self):
+        survey = {
+            'substrate_mostly_large': True,       # 14
+            'smothering_no': True,                # 10
+            'silting_yes': True,                  # 0
+            'cover_boulders': True,               # 2
+            'cover_water_plants': True,           # 2
+            'curviness_one_two_good_bends': True,  # 6
+            'natural_mostly_natural': True,       # 12
+            'width_narrow': True,                 # 5
+            'landuse_park': True,                 # 2
+            'erosion_open_pasture': True,         # 2
+            'shading_partly': True,               # 2
+            'depth_knee_deep': True,              # 4
+            'flow_fast': True,                    # 3
+            'flow_slow': True,                    # 1
+            'riffles_none': True,                 # 0
+            'substrate_fist_size': True,          # 7
+        }
+        scores = score_survey(survey)
+
+        self.assertEqual(scores['section1'], 24)
+        self.assertEqual(scores['section2'], 4)
+        self.assertEqual(scores['section3'], 18)
+        self.assertEqual(scores['section4'], 11)
+        self.assertEqual(scores['section5'], 8)
+        self.assertEqual(scores['section6'], 7)
+        self.assertEqual(scores['total'], 72)
+
+    def test_two_checks_in_a_single_choice_group_are_averaged(self):
+        scores = score_survey({
+            'curviness_two_plus_good_bends': True,  # 9
+            'curviness_one_two_good_bends': True,   # 6
+        })
+        self.assertEqual(scores['section3'], 7.5)
+
+    def test_matrix_scores_every_row(self):
+        matrix = np.zeros((3, len(SCORE_FIELDS)), dtype=bool)
+        matrix[1, SCORE_FIELDS.index('cover_boulders')] = True
+        matrix[2, :] = True
+
+        scores = score_matrix(matrix)
+
+        self.assertEqual(scores['section2'].tolist(), [0, 2, 20])
+        self.assertEqual(scores['total'][0], 0)
+
+    def test_lookup_tables_match_group_walk(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.random((500, len(SCORE_FIELDS))) < 0.3
+
+        scores = score_matrix(matrix)
+
+        for section in SECTIONS:
+            columns = [FIELD_INDEX[f] for f in SECTION_FIELDS[section['name']]]
+            np.testing.assert_array_equal(
+                scores[section['name']], _score_groups(section, matrix[:, columns])
+            )
+
+    def test_pack_sections_matches_pack_matrix(self):
+        survey = {'substrate_mostly_small': True, 'silting_no': True, 'flow_none': True}
+        matrix = np.array([[bool(survey.get(f)) for f in SCORE_FIELDS]])
+
+        self.assertEqual(pack_sections(survey), pack_matrix(matrix)[0].tolist())
+
+
+class PackedFlagsTests(TestCase):
+
+    def test_save_packs_section_flags(self):
+        survey = make_survey(substrate_mostly_medium=True, silting_no=True, cover_boulders=True)
+        survey.save()
+        survey.refresh_from_db()
+
+        self.assertEqual(survey.section1_flags, 0b010000010)
+        self.assertEqual(survey.section2_flags, 0b100)
+        self.assertEqual(survey.section3_flags, 0)
+
+    def test_bulk_create_packs_section_flags(self):
+        CQHEISurvey.objects.bulk_create([make_survey(flow_none=True)])
+
+        self.assertEqual(CQHEISurvey.objects.get().section5_flags, 1 << 8)
+
+    def test_update_sets_and_clears_packed_bits(self):
+        make_survey(substrate_mostly_medium=True, silting_no=True, cover_boulders=True).save()
+
+        CQHEISurvey.objects.update(silting_no=False, silting_yes=True, cover_deep_areas=True)
+
+        survey = CQHEISurvey.objects.get()
+        self.assertEqual([survey.section1_flags, survey.section2_flags], pack_sections(survey)[:2])
+        self.assertTrue(CQHEISurvey.objects.compact().get().silting_yes)
+        with self.assertRaises(TypeError):
+            CQHEISurvey.objects.update(cover_deep_areas=F('cover_boulders'))
+
+    def test_bulk_update_repacks_section_flags(self):
+        make_survey(width_narrow=True).save()
+        survey = CQHEISurvey.objects.get()
+        survey.width_narrow = False
+        survey.width_wide = True
+
+        CQHEISurvey.objects.bulk_update([survey], ['width_narrow', 'width_wide'])
+
+        survey.refresh_from_db()
+        self.assertEqual(survey.section4_flags, pack_sections(survey)[3])
+
+    def test_compact_mode_decodes_checkboxes_without_extra_queries(self):
+        make_survey(width_narrow=True, riffles_none=True).save()
+
+        with self.assertNumQueries(1):
+            survey = CQHEISurvey.objects.compact().get()
+            self.assertTrue(survey.width_narrow)
+            self.assertTrue(survey.riffles_none)
+            self.assertFalse(survey.width_wide)
+
+    def test_score_queryset_matches_checkbox_matrix(self):
+        make_survey(substrate_mostly_large=True, flow_fast=True).save()
+        make_survey(cover_boulders=True, cover_backwaters=True, depth_chest_deep=True).save()
+        queryset = CQHEISurvey.objects.order_by('id')
+
+        ids, scores = score_queryset(queryset)
+        matrix_ids, matrix = survey_matrix(queryset)
+
+        np.testing.assert_array_equal(ids, matrix_ids)
+        np.testing.assert_array_equal(scores['total'], score_matrix(matrix)['total'])
+        self.assertEqual(scores['total'].tolist(), [17, 12])
+
+
+class ExportTests(TestCase):
+
+    def test_export_streams_every_survey_in_blocks(self):
+        for i in range(5):
+            make_survey(river_site=f'Site {i}', cover_boulders=True, cover_score=2).save()
+
+        response = self.client.get(reverse('export_surveys'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+        blocks = list(views.export_rows(CQHEISurvey.objects.order_by('id'), chunk_size=2))
+        self.assertEqual(len(blocks), 3)
+
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], views.EXPORT_FIELDS)
+        self.assertEqual([row[7] for row in rows[1:]], [f'Site {i}' for i in range(5)])
+        self.assertEqual({row[-1] for row in rows[1:]}, {'2'})
+
+    def test_export_expands_packed_flags_instead_of_reading_checkboxes(self):
+        make_survey(cover_boulders=True, riffles_none=True, width_narrow=True).save()
+        make_survey(substrate_mostly_large=True).save()
+
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(csv.reader(io.StringIO(''.join(views.export_rows(CQHEISurvey.objects.order_by('id'))))))
+
+        self.assertNotIn('cover_boulders', queries[0]['sql'])
+        for survey, row in zip(CQHEISurvey.objects.order_by('id'), rows[1:]):
+            exported = dict(zip(views.EXPORT_FIELDS, row))
+            self.assertEqual({name: exported[name] for name in SCORE_FIELDS},
+                             {name: str(getattr(survey, name)) for name in SCORE_FIELDS})
+
+
+class SurveyListTests(TestCase):
+
+    def test_keyset_pages_walk_every_survey_once(self):
+        for day in range(1, 8):
+            for _ in range(2):
+                make_survey(survey_date=datetime.date(2024, 5, day)).save()
+
+        seen = []
+        query = ''
+        with mock.patch.object(views, 'LIST_PAGE_SIZE', 4):
+            while query is not None:
+                response = self.client.get(f"{reverse('survey_list')}?{query}")
+                seen.extend(survey['id'] for survey in response.context['surveys'])
+                query = response.context['next_query']
+
+        expected = list(
+            CQHEISurvey.objects.order_by('-survey_date', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_filters_and_projection(self):
+        make_survey(river_code='R01', survey_date=datetime.date(2023, 1, 1)).save()
+        make_survey(river_code='R01', survey_date=datetime.date(2024, 1, 1)).save()
+        make_survey(river_code='R02', survey_date=datetime.date(2024, 1, 1)).save()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse('survey_list'), {'river_code': 'R01', 'date_from': '2023-06-01'}
+            )
+
+        surveys = response.context['surveys']
+        self.assertEqual(len(surveys), 1)
+        self.assertEqual(set(surveys[0]), set(views.LIST_FIELDS))
+        self.assertIsNone(response.context['next_query'])
+
+
+VALID_ROW = {
+    'survey_date': '2024-06-01',
+    'river_code': 'R01',
+    'river_mile': '12.5',
+    'river_site': 'Mill Creek at Route 9',
+    'name_group': 'Field Crew A',
+    'reach_length': '100m',
+}
+
+
+class ImportTests(TestCase):
+
+    def assertMatchesForm(self, row):
+        form = CQHEISurveyForm(data={k: v for k, v in row.items() if v not in ('0', '')})
+        form.is_valid()
+        expected = {k: list(v) for k, v in form.errors.items()}
+        _data, errors = validate_row(row)
+        self.assertEqual(errors, expected)
+        _data, _matrix, [errors] = validate_batch({k: [v] for k, v in row.items()})
+        self.assertEqual(errors, expected)
+
+    def test_validation_errors_match_the_form(self):
+        self.assertMatchesForm(VALID_ROW)
+        self.assertMatchesForm({**VALID_ROW, 'river_mile': '-1'})
+        self.assertMatchesForm({**VALID_ROW, 'river_mile': '12.345', 'survey_date': ''})
+        self.assertMatchesForm({**VALID_ROW, 'survey_date': '2999-01-01'})
+        self.assertMatchesForm({**VALID_ROW, 'reach_length': 'other'})
+        self.assertMatchesForm({**VALID_ROW, 'reach_length': '3m'})
+        self.assertMatchesForm({**VALID_ROW, 'width_wide': '1', 'width_none': '1'})
+        self.assertMatchesForm({
+            **VALID_ROW, 'reach_length': 'other', 'depth_knee_deep': '1', 'depth_ankle_deep': '1',
+        })
+
+    def test_batch_validation_matches_row_validation(self):
+        rows = [
+            VALID_ROW,
+            {**VALID_ROW, 'river_mile': '1000'},
+            {**VALID_ROW, 'reach_length': 'other', 'width_wide': 'x', 'width_none': 'yes'},
+            {**VALID_ROW, 'reach_length': 'other', 'reach_length_custom': '80m'},
+            {**VALID_ROW, 'river_mile': '1000', 'survey_date': 'soon'},
+        ]
+        columns = {name: [row.get(name) for row in rows] for name in {k for row in rows for k in row}}
+
+        data, matrix, errors = validate_batch(columns)
+
+        self.assertEqual(errors, [validate_row(row)[1] for row in rows])
+        self.assertEqual(data['reach_length_custom'], ['', '', '', '80m', ''])
+        self.assertEqual(matrix.sum(), 2)
+
+    def test_import_writes_surveys_and_covers_in_batches(self):
+        rows = [
+            {**VALID_ROW, 'river_site': f'Site {i}', 'cover_boulders': 'x', 'cover_water_plants': 'yes'}
+            for i in range(5)
+        ]
+        rows.insert(2, {**VALID_ROW, 'river_mile': 'abc'})
+
+        report = import_rows(rows, batch_size=2)
+
+        self.assertEqual(report['rows'], 6)
+        self.assertEqual(report['imported'], 5)
+        self.assertEqual(report['errors'], [{'row': 3, 'errors': {'river_mile': ['Enter a number.']}}])
+        self.assertEqual(CQHEISurvey.objects.filter(cover_score=4).count(), 5)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT c.Cover_Score FROM {cover_table()} c '
+                f'JOIN cqhei_app_cqheisurvey s ON s.id = c.cQHEI_New_X_ID'
+            )
+            self.assertEqual([row[0] for row in cursor.fetchall()], [4] * 5)
+
+    def test_parallel_import_matches_serial_order_and_errors(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=[*VALID_ROW, 'cover_boulders'])
+        writer.writeheader()
+        for i in range(7):
+            writer.writerow({**VALID_ROW, 'river_site': f'Site "{i}"\nnorth bank', 'cover_boulders': '1'})
+        writer.writerow({**VALID_ROW, 'survey_date': 'yesterday'})
+        buffer.seek(0)
+
+        report = import_file(buffer, 'csv', batch_size=3, workers=2, chunk_size=2)
+
+        self.assertEqual((report['rows'], report['imported']), (8, 7))
+        self.assertEqual(report['errors'], [{'row': 8, 'errors': {'survey_date': ['Enter a valid date.']}}])
+        self.assertEqual(
+            list(CQHEISurvey.objects.order_by('id').values_list('river_site', flat=True)),
+            [f'Site "{i}"\nnorth bank' for i in range(7)],
+        )
+
+    def test_parallel_import_numbers_rows_like_serial_past_blank_lines(self):
+        content = '\r\n'.join([
+            ','.join(VALID_ROW), '', ','.join(VALID_ROW.values()), '', '',
+            ','.join({**VALID_ROW, 'river_mile': 'far'}.values()), '', ','.join(VALID_ROW.values()), '',
+        ])
+
+        serial = import_file(io.StringIO(content, newline=''), 'csv')
+        parallel = import_file(io.StringIO(content, newline=''), 'csv', workers=2, chunk_size=1)
+
+        self.assertEqual(serial['errors'], [{'row': 2, 'errors': {'river_mile': ['Enter a number.']}}])
+        self.assertEqual((parallel['rows'], parallel['errors']), (serial['rows'], serial['errors']))
+
+    def test_parallel_import_reports_malformed_csv_like_serial(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        path = os.path.join(scratch.name, 'surveys.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(VALID_ROW)
+            writer.writerow(VALID_ROW.values())
+            writer.writerow({**VALID_ROW, 'river_site': 'x' * 200_000}.values())
+
+        messages = []
+        for workers in ('1', '2'):
+            with self.assertRaises(CommandError) as raised:
+                call_command('import_surveys', path, '--workers', workers, stdout=io.StringIO())
+            messages.append(str(raised.exception))
+
+        self.assertIn('field larger than field limit', messages[0])
+        self.assertEqual(messages[0], messages[1])
+
+    def test_unreadable_uploads_are_rejected_with_400(self):
+        uploads = [
+            ('surveys.json', b'[{"river_code": '),
+            ('surveys.json', b'[1, 2]'),
+            ('surveys.json', b'"surveys"'),
+            ('surveys.csv', 'river_code,river_site\nR01,Caf\u00e9\n'.encode('latin-1')),
+        ]
+        for name, content in uploads:
+            with self.subTest(content=content):
+                response = self.client.post(reverse('import_surveys'), {'file': SimpleUploadedFile(name, content)})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertFalse(CQHEISurvey.objects.exists())
+
+    def test_upload_unreadable_past_the_first_batch_writes_nothing(self):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=VALID_ROW)
+        writer.writeheader()
+        writer.writerows([VALID_ROW] * DEFAULT_CHUNK_SIZE * 2)
+        content = buffer.getvalue().encode() + 'R01,Caf\u00e9\r\n'.encode('latin-1')
+
+        response = self.client.post(reverse('import_surveys'), {'file': SimpleUploadedFile('surveys.csv', content)})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CQHEISurvey.objects.exists())
+
+    def test_upload_endpoint_returns_report(self):
+        content = json.dumps([VALID_ROW, {**VALID_ROW, 'name_group': ''}]).encode()
+        upload = SimpleUploadedFile('surveys.json', content, content_type='application/json')
+
+        response = self.client.post(reverse('import_surveys'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['errors'][0]['errors'], {'name_group': ['This field is required.']})
+
+
+class CoverWriteTests(TestCase):
+
+    def test_insert_returns_id_and_computed_score(self):
+        cover_id, cover_score = insert_cover(41, {'cover_boulders': True, 'cover_deep_areas': True})
+
+        self.assertIsNotNone(cover_id)
+        self.assertEqual(cover_score, 4)
+
+    def test_batched_insert_spans_several_statements(self):
+        n = batch_size() * 2 + 3
+        items = [(i, {'cover_boulders': i % 2 == 0}) for i in range(n)]
+
+        # three INSERTs plus the site lookup of the summary update
+        with self.assertNumQueries(4):
+            written = insert_covers(items)
+
+        self.assertEqual(len(written), n)
+        self.assertEqual({written[i][1] for i in range(0, n, 2)}, {2})
+        self.assertEqual({written[i][1] for i in range(1, n, 2)}, {0})
+
+    def test_upsert_updates_existing_rows_and_inserts_new_ones(self):
+        insert_covers([(1, {'cover_boulders': True}), (2, {})])
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {cover_table()} SET Last_Updated_Timestamp = %s', ['2020-01-01'])
+
+        written = upsert_covers([
+            (1, {'cover_boulders': True, 'cover_water_plants': True}),
+            (3, {'cover_backwaters': True}),
+            (3, {}),
+        ])
+
+        self.assertEqual({k: v[1] for k, v in written.items()}, {1: 4, 3: 0})
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT cQHEI_New_X_ID, Cover_Score, Last_Updated_Timestamp > Created_Timestamp '
+                f'FROM {cover_table()} ORDER BY cQHEI_New_X_ID'
+            )
+            rows = cursor.fetchall()
+        self.assertEqual(rows, [(1, 4, 1), (2, 0, 0), (3, 0, 0)])
+
+    def test_survey_form_posts_in_the_same_second_both_succeed(self):
+        now = timezone.now()
+        with mock.patch('builtins.print'), mock.patch('cqhei_app.views.timezone.now', return_value=now):
+            first = self.client.post(reverse('survey_form'), {**VALID_ROW, 'cover_boulders': 'on'})
+            second = self.client.post(reverse('survey_form'), VALID_ROW)
+
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual((first.context['cover_score'], second.context['cover_score']), (2, 0))
+        # the newest row of a shared key is the one read back
+        self.assertEqual(cover_scores(), {int(now.timestamp()): 0})
+
+    def test_survey_form_post_shows_cover_score(self):
+        data = {**VALID_ROW, 'cover_boulders': 'on', 'cover_water_plants': 'on', 'cover_backwaters': 'on'}
+
+        response = self.client.post(reverse('survey_form'), data)
+
+        self.assertTemplateUsed(response, 'success.html')
+        self.assertEqual(response.context['cover_score'], 6)
+
+
+class SiteSummaryTests(TestCase):
+
+    def test_new_surveys_and_covers_update_running_totals(self):
+        first = make_survey(survey_date=datetime.date(2024, 5, 1), substrate_mostly_medium=True)
+        first.save()
+        insert_cover(first.pk, {'cover_boulders': True})
+        second = make_survey(silting_no=True)
+        second.save()
+        insert_cover(second.pk, {'cover_boulders': True, 'cover_deep_areas': True})
+
+        summary = SiteSummary.objects.get(river_code='R01', river_mile='12.50')
+        totals = [score_survey(first)['total'], score_survey(second)['total']]
+        self.assertEqual(summary.survey_count, 2)
+        self.assertAlmostEqual(summary.cqhei_mean, sum(totals) / 2)
+        self.assertEqual((summary.cqhei_min, summary.cqhei_max), (min(totals), max(totals)))
+        self.assertEqual((summary.cover_count, summary.cover_min, summary.cover_max), (2, 2, 4))
+        self.assertEqual(summary.latest_survey_id, second.pk)
+        self.assertEqual(summary.latest_cover_score, 4)
+        self.assertEqual(rebuild(check=True), [])
+
+    def test_a_second_cover_row_replaces_the_first(self):
+        survey = make_survey()
+        survey.save()
+        elsewhere = make_survey(river_mile='3.00')
+        elsewhere.save()
+        insert_cover(survey.pk, {'cover_boulders': True, 'cover_deep_areas': True})
+        insert_covers([(survey.pk, {'cover_boulders': True}), (elsewhere.pk, {'cover_deep_areas': True})])
+
+        summary = SiteSummary.objects.get(river_mile='12.50')
+        self.assertEqual((summary.cover_count, summary.cover_sum, summary.cover_max), (1, 2, 2))
+        self.assertEqual(summary.latest_cover_score, 2)
+        self.assertEqual(SiteSummary.objects.get(river_mile='3.00').cover_count, 1)
+        self.assertEqual(rebuild(check=True), [])
+
+    def test_edits_and_deletes_recompute_affected_sites(self):
+        low = make_survey()
+        low.save()
+        high = make_survey(substrate_mostly_medium=True, silting_no=True)
+        high.save()
+
+        moved = CQHEISurvey.objects.get(pk=high.pk)
+        moved.river_mile = '14.00'
+        moved.save()
+        low.delete()
+
+        self.assertFalse(SiteSummary.objects.filter(river_mile='12.50').exists())
+        summary = SiteSummary.objects.get(river_mile='14.00')
+        self.assertEqual(summary.survey_count, 1)
+        self.assertEqual(summary.cqhei_min, score_survey(high)['total'])
+        self.assertEqual(rebuild(check=True), [])
+
+    def test_import_and_upsert_keep_summaries_in_step(self):
+        rows = [{**VALID_ROW, 'cover_boulders': '1'}, {**VALID_ROW, 'river_mile': '3.00'}]
+        import_rows(rows)
+        upsert_covers([(pk, {}) for pk in CQHEISurvey.objects.values_list('pk', flat=True)])
+
+        self.assertEqual(SiteSummary.objects.count(), 2)
+        self.assertEqual(set(SiteSummary.objects.values_list('cover_max', flat=True)), {0})
+        self.assertEqual(rebuild(check=True), [])
+
+    def test_rebuild_reports_and_repairs_drift(self):
+        make_survey().save()
+        SiteSummary.objects.update(survey_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_site_summaries', '--check', stderr=io.StringIO())
+        call_command('rebuild_site_summaries', stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(SiteSummary.objects.get().survey_count, 1)
+        self.assertEqual(rebuild(check=True), [])
+
+
+# Caches one site's series, imports a survey at that site with the
+# management command in a second process, and prints the number of
+# surveys in the series before and after
+CROSS_PROCESS_SERIES_SCRIPT = """
+import json
+import os
+import subprocess
+import sys
+
+import django
+django.setup()
+from django.core.management import call_command
+
+from cqhei_app.models import CQHEISurvey
+from cqhei_app.series import series_json
+
+call_command('migrate', verbosity=0)
+CQHEISurvey.objects.create(
+    survey_date='2024-06-01', river_code='R01', river_mile='12.5',
+    river_site='Mill Creek at Route 9', name_group='Field Crew A', reach_length='100m',
+)
+print(len(json.loads(series_json('R01', 'Mill Creek at Route 9'))['ids']))
+subprocess.run(
+    [sys.executable, 'manage.py', 'import_surveys', os.environ['CQHEIIMPORT']],
+    check=True, stdout=subprocess.DEVNULL,
+)
+print(len(json.loads(series_json('R01', 'Mill Creek at Route 9'))['ids']))
+"""
+
+
+class SiteSeriesTests(TestCase):
+
+    def setUp(self):
+        caches[series.SERIES_CACHE].clear()
+
+    def url(self, river_site='Mill Creek at Route 9'):
+        return reverse('site_series', args=['R01', river_site])
+
+    def test_series_is_columnar_and_oldest_first(self):
+        newer = make_survey(survey_date=datetime.date(2024, 6, 1), silting_no=True)
+        newer.save()
+        older = make_survey(survey_date=datetime.date(2019, 6, 1), river_mile='12.00')
+        older.save()
+        make_survey(river_site='Elsewhere').save()
+
+        data = self.client.get(self.url()).json()
+
+        self.assertEqual(data['ids'], [older.pk, newer.pk])
+        self.assertEqual(data['dates'], ['2019-06-01', '2024-06-01'])
+        self.assertEqual(data['miles'], [12.0, 12.5])
+        self.assertEqual(data['total'], [score_survey(older)['total'], score_survey(newer)['total']])
+        self.assertEqual(len(data['section3']), 2)
+
+    def test_repeat_views_are_served_from_cache_until_a_write(self):
+        make_survey().save()
+        self.client.get(self.url())
+
+        # a single cache read; the surveys are not queried
+        with mock.patch.object(series, 'build_series') as build_series, self.assertNumQueries(1):
+            first = self.client.get(self.url()).content
+        build_series.assert_not_called()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_survey(survey_date=datetime.date(2024, 7, 1)).save()
+
+        self.assertNotEqual(self.client.get(self.url()).content, first)
+        self.assertEqual(len(self.client.get(self.url()).json()['ids']), 2)
+
+    def test_rows_read_before_a_write_commits_are_not_served_after_it(self):
+        make_survey().save()
+        build_series = series.build_series
+
+        def build_then_write(*args):
+            payload = build_series(*args)
+            with self.captureOnCommitCallbacks(execute=True):
+                make_survey(survey_date=datetime.date(2024, 7, 1)).save()
+            return payload
+
+        with mock.patch.object(series, 'build_series', side_effect=build_then_write):
+            self.assertEqual(len(self.client.get(self.url()).json()['ids']), 1)
+
+        self.assertEqual(len(self.client.get(self.url()).json()['ids']), 2)
+
+    def test_a_write_in_another_process_invalidates_the_series(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('WEBSITE_HOSTNAME', 'PROMETHEUS_MULTIPROC_DIR')
+        }
+        env.update({
+            'DJANGO_SETTINGS_MODULE': 'cqhei_project.settings',
+            'SQLITE_PATH': os.path.join(scratch.name, 'db.sqlite3'),
+            'CQHEIIMPORT': os.path.join(scratch.name, 'surveys.json'),
+        })
+        with open(env['CQHEIIMPORT'], 'w') as f:
+            json.dump([{**VALID_ROW, 'survey_date': '2024-07-01'}], f)
+
+        result = subprocess.run(
+            [sys.executable, '-c', CROSS_PROCESS_SERIES_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), ['1', '2'])
+
+    def test_moving_a_survey_invalidates_both_sites(self):
+        make_survey().save()
+        self.client.get(self.url())
+        self.client.get(self.url('New Bridge'))
+
+        survey = CQHEISurvey.objects.get()
+        survey.river_site = 'New Bridge'
+        with self.captureOnCommitCallbacks(execute=True):
+            survey.save()
+
+        self.assertEqual(self.client.get(self.url()).json()['ids'], [])
+        self.assertEqual(self.client.get(self.url('New Bridge')).json()['ids'], [survey.pk])
+
+
+@override_settings(ROOT_URLCONF='cqhei_project.async_urls')
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        caches[series.SERIES_CACHE].clear()
+        for day in range(1, 6):
+            make_survey(survey_date=datetime.date(2024, 5, day), cover_boulders=True, cover_score=2).save()
+
+    async def test_list_pages_match_the_sync_view(self):
+        with mock.patch.object(views, 'LIST_PAGE_SIZE', 3):
+            first = await self.async_client.get(reverse('survey_list'))
+            rest = await self.async_client.get(f"{reverse('survey_list')}?{first.context['next_query']}")
+
+        ids = [survey['id'] for survey in [*first.context['surveys'], *rest.context['surveys']]]
+        expected = [pk async for pk in CQHEISurvey.objects.order_by('-survey_date', '-id').values_list('id', flat=True)]
+        self.assertEqual(ids, expected)
+        self.assertIsNone(rest.context['next_query'])
+
+    async def test_export_streams_asynchronously(self):
+        response = await self.async_client.get(reverse('export_surveys'))
+        self.assertTrue(response.is_async)
+
+        content = b''.join([block async for block in response.streaming_content])
+        with self.settings(ROOT_URLCONF='cqhei_project.urls'):
+            expected = await sync_to_async(
+                lambda: b''.join(self.client.get(reverse('export_surveys')).streaming_content)
+            )()
+        self.assertEqual(content, expected)
+
+    async def test_series_matches_the_sync_view(self):
+        url = reverse('site_series', args=['R01', 'Mill Creek at Route 9'])
+        response = await self.async_client.get(url)
+        self.assertEqual(len(response.json()['ids']), 5)
+        self.assertEqual((await self.async_client.post(url)).status_code, 405)
+
+
+# Serves GET /surveys/ several times through cqhei_project.asgi the way
+# uvicorn does, then prints how many connections were opened and how many
+# are still open
+ASGI_CONNECTIONS_SCRIPT = """
+import asyncio
+
+import django
+django.setup()
+from asgiref.testing import ApplicationCommunicator
+from django.core.management import call_command
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+call_command('migrate', verbosity=0)
+connections.close_all()
+opened = []
+connection_created.connect(lambda sender, connection, **kwargs: opened.append(connection), weak=False)
+
+from cqhei_project.asgi import application
+
+
+async def get(path):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+        'method': 'GET', 'path': path, 'query_string': b'', 'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+    }
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({'type': 'http.request', 'body': b''})
+    assert (await communicator.receive_output(10))['status'] == 200
+    while (await communicator.receive_output(10)).get('more_body'):
+        pass
+    await communicator.wait(10)
+
+
+async def main():
+    for _ in range(5):
+        await get('/surveys/')
+
+asyncio.run(main())
+print(len(opened), sum(connection.connection is not None for connection in opened))
+"""
+
+
+class AsgiConnectionTests(SimpleTestCase):
+
+    def test_async_requests_leave_no_connection_open(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('WEBSITE_HOSTNAME', 'DBCONNMAXAGE')
+        }
+        env.update({
+            'DJANGO_SETTINGS_MODULE': 'cqhei_project.settings_asgi',
+            'SQLITE_PATH': os.path.join(scratch.name, 'db.sqlite3'),
+        })
+        result = subprocess.run(
+            [sys.executable, '-c', ASGI_CONNECTIONS_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        opened, still_open = map(int, result.stdout.split())
+        self.assertGreaterEqual(opened, 1)
+        self.assertEqual(still_open, 0)
+
+
+class SurveyFormPageTests(TestCase):
+
+    def setUp(self):
+        caches['fragments'].clear()
+
+    def test_unbound_form_markup_is_rendered_once(self):
+        first = self.client.get(reverse('survey_form'))
+
+        with mock.patch('django.forms.boundfield.BoundField.as_widget') as as_widget:
+            second = self.client.get(reverse('survey_form'))
+
+        as_widget.assert_not_called()
+        self.assertContains(second, 'name="cover_boulders"')
+        self.assertContains(second, 'csrfmiddlewaretoken')
+        self.assertEqual(first.content.count(b'<input'), second.content.count(b'<input'))
+
+    def test_invalid_post_renders_its_own_values(self):
+        self.client.get(reverse('survey_form'))
+
+        response = self.client.post(reverse('survey_form'), {**VALID_ROW, 'river_code': 'R77', 'river_mile': '-1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'value="R77"')
+
+
+    def test_valid_post_is_one_insert(self):
+        with mock.patch('builtins.print'), self.assertNumQueries(1):
+            response = self.client.post(reverse('survey_form'), {**VALID_ROW, 'cover_boulders': 'on'})
+
+        self.assertContains(response, '<strong>Cover Score:</strong> 2')
+
+
+class ConnectionStatsTests(TestCase):
+
+    def setUp(self):
+        connections.reset()
+        self.addCleanup(connections.reset)
+
+    def test_hit_rate_counts_only_requests_that_queried(self):
+        self.client.get('/no-such-page/')
+        for _ in range(3):
+            self.client.get(reverse('survey_list'))
+        # a request that has to open a connection, as after CONN_MAX_AGE
+        connections.count_request(sender=None)
+        connections.count_connection(sender=connection.__class__, connection=connection)
+        CQHEISurvey.objects.exists()
+        connections.count_db_request(sender=None)
+
+        stats = connections.stats()
+
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['db_requests'], 4)
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['reused'], 3)
+        self.assertEqual(stats['hit_rate'], 0.75)
+        self.assertEqual(stats['by_alias'], {'default': 1})
+
+    def test_no_requests_has_no_hit_rate(self):
+        self.client.get('/no-such-page/')
+
+        self.assertIsNone(connections.stats()['hit_rate'])
+
+
+class SyntheticSurveyTests(TestCase):
+
+    def test_generated_surveys_pass_the_form_rules(self):
+        report = write_surveys(300, seed=1, batch_size=128)
+        self.assertEqual(report['rows'], 300)
+
+        fields = ['survey_date', 'river_code', 'river_mile', 'river_site', 'name_group',
+                  'clarity', 'cluster_number', 'reach_length', 'reach_length_custom', *SCORE_FIELDS]
+        for survey in CQHEISurvey.objects.compact():
+            row = {name: getattr(survey, name) for name in fields}
+            self.assertEqual(validate_row({k: v if isinstance(v, bool) else str(v) for k, v in row.items()})[1], {})
+            self.assertEqual(survey.cover_score, score_survey(survey)['section2'])
+
+        self.assertEqual(cover_scores(), dict(CQHEISurvey.objects.values_list('id', 'cover_score')))
+
+    def test_same_seed_gives_the_same_surveys(self):
+        first, second = SurveyGenerator(seed=3), SurveyGenerator(seed=3)
+        columns, matrix = first.batch(50)
+        again, again_matrix = second.batch(50)
+
+        self.assertTrue(np.array_equal(matrix, again_matrix))
+        for name, values in columns.items():
+            self.assertTrue(np.array_equal(values, again[name]), name)
+
+    def test_command_appends_after_existing_surveys(self):
+        make_survey().save()
+        call_command('generate_surveys', '40', '--no-summaries', stdout=io.StringIO())
+
+        self.assertEqual(CQHEISurvey.objects.count(), 41)
+        self.assertEqual(len(cover_scores()), 40)
+
+
+TIMED_TEMPLATES = [{**settings.TEMPLATES[0], 'BACKEND': 'cqhei_app.timing.TimedDjangoTemplates'}]
+
+
+@override_settings(REQUEST_TIMING=True, REQUEST_TIMING_SLOW_MS=10_000, TEMPLATES=TIMED_TEMPLATES)
+class RequestTimingTests(TestCase):
+
+    def timing(self, response):
+        parts = dict(
+            (part.split(';')[0], part) for part in response['Server-Timing'].split(', ')
+        )
+        return {name: float(part.split('dur=')[1].split(';')[0]) for name, part in parts.items()}, parts
+
+    def test_server_timing_splits_db_template_and_app_time(self):
+        make_survey().save()
+        response = self.client.get(reverse('survey_list'))
+
+        durations, parts = self.timing(response)
+        self.assertEqual(set(durations), {'total', 'db', 'tpl', 'app'})
+        self.assertIn('desc="1 queries"', parts['db'])
+        self.assertGreater(durations['tpl'], 0)
+        self.assertLessEqual(durations['db'] + durations['tpl'], durations['total'] + 0.1)
+
+    def test_slow_requests_are_logged_as_json(self):
+        with self.settings(REQUEST_TIMING_SLOW_MS=0):
+            client = type(self.client)()
+            with self.assertLogs('cqhei_app.timing', 'WARNING') as logs:
+                client.get(reverse('survey_list'))
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['route'], 'survey_list')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['queries'], 1)
+
+    def test_off_by_default(self):
+        with self.settings(REQUEST_TIMING=False):
+            response = type(self.client)().get(reverse('survey_list'))
+        self.assertNotIn('Server-Timing', response)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MetricsTests(TestCase):
+
+    def test_requests_are_counted_by_route_name(self):
+        make_survey().save()
+        labels = {'route': 'survey_list', 'method': 'GET', 'status': '200'}
+        before = sample('cqhei_requests_total', **labels)
+        queries = sample('cqhei_request_queries_sum', route='survey_list')
+        seconds = sample('cqhei_request_seconds_count', route='survey_list', method='GET')
+
+        self.client.get(reverse('survey_list'))
+
+        self.assertEqual(sample('cqhei_requests_total', **labels), before + 1)
+        self.assertEqual(sample('cqhei_request_queries_sum', route='survey_list'), queries + 1)
+        self.assertEqual(sample('cqhei_request_seconds_count', route='survey_list', method='GET'), seconds + 1)
+
+    def test_unmatched_routes_share_one_label(self):
+        before = sample('cqhei_requests_total', route='unmatched', method='GET', status='404')
+        self.client.get('/no/such/page/')
+        self.assertEqual(sample('cqhei_requests_total', route='unmatched', method='GET', status='404'), before + 1)
+
+    def test_scores_are_counted(self):
+        survey = make_survey()
+        survey.save()
+        single = sample('cqhei_scores_computed_total', kind='single')
+        batch = sample('cqhei_scores_computed_total', kind='batch')
+        cover = sample('cqhei_scores_computed_total', kind='cover')
+
+        score_survey({'cover_boulders': True})
+        score_matrix(np.zeros((3, len(SCORE_FIELDS)), dtype=bool))
+        insert_cover(survey.id, {'cover_boulders': True})
+
+        self.assertEqual(sample('cqhei_scores_computed_total', kind='single'), single + 1)
+        self.assertEqual(sample('cqhei_scores_computed_total', kind='batch'), batch + 3)
+        self.assertEqual(sample('cqhei_scores_computed_total', kind='cover'), cover + 1)
+
+    def test_endpoint_serves_prometheus_text(self):
+        self.client.get(reverse('survey_form'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'cqhei_requests_total{method="GET",route="survey_form",status="200"}', response.content)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', IS_AZURE=True)
+    def test_endpoint_needs_a_token_on_azure(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    def test_unknown_methods_share_one_label(self):
+        before = sample('cqhei_requests_total', route='survey_list', method='other', status='200')
+
+        self.client.generic('BREW', reverse('survey_list'))
+
+        self.assertEqual(sample('cqhei_requests_total', route='survey_list', method='other', status='200'), before + 1)
+        self.assertIsNone(REGISTRY.get_sample_value(
+            'cqhei_requests_total', {'route': 'survey_list', 'method': 'BREW', 'status': '200'},
+        ))
+
+    @unittest.skipIf(gunicorn is None, "gunicorn is not installed")
+    def test_preloaded_gunicorn_serves_metrics_from_every_worker(self):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('DJANGO_SETTINGS_MODULE', 'WEBSITE_HOSTNAME', 'PROMETHEUS_MULTIPROC_DIR')
+        }
+        env.update({
+            'SQLITE_PATH': os.path.join(scratch.name, 'db.sqlite3'),
+            'GUNICORNBIND': f'127.0.0.1:{port}',
+            'GUNICORNWORKERS': '2',
+            'GUNICORNPRELOAD': 'true',
+            'PROMETHEUS_MULTIPROC_DIR': os.path.join(scratch.name, 'metrics'),
+        })
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'cqhei_project.wsgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+
+        base = f'http://127.0.0.1:{port}'
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                urllib.request.urlopen(base + '/', timeout=1).read()
+                break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    self.fail(f"gunicorn did not start:\n{server.stderr.read().decode()}")
+                time.sleep(0.2)
+        for _ in range(9):
+            urllib.request.urlopen(base + '/', timeout=5).read()
+
+        body = urllib.request.urlopen(base + '/metrics/', timeout=5).read().decode()
+        self.assertIn('cqhei_requests_total{method="GET",route="survey_form",status="200"} 10.0', body)
+
+    @override_settings(METRICS=False)
+    def test_can_be_switched_off(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
+
+
+@override_settings(PROFILE_TOKEN='s3cret', PROFILE_SAMPLE_EVERY=0)
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        overridden = self.settings(PROFILE_DIR=self.directory, PROFILE_KEEP=2)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def test_token_profiles_the_request_and_links_the_report(self):
+        response = self.client.get(reverse('survey_list'), HTTP_X_PROFILE='s3cret')
+        self.assertEqual(response.status_code, 200)
+        link = response['X-Profile']
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        report = self.client.get(link, {'profile': 's3cret'})
+        self.assertEqual(report.status_code, 200)
+        self.assertIn(b'cumulative', report.content)
+        self.assertIn(b'survey_list', report.content)
+        # the report is as private as the trigger
+        self.assertEqual(self.client.get(link).status_code, 404)
+
+    def test_wrong_or_missing_token_is_not_profiled(self):
+        self.assertNotIn('X-Profile', self.client.get(reverse('survey_list'), {'profile': 'guess'}))
+        self.assertNotIn('X-Profile', self.client.get(reverse('survey_list')))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_only_the_newest_profiles_are_kept(self):
+        for _ in range(4):
+            self.client.get(reverse('survey_list'), {'profile': 's3cret'})
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    def test_report_names_cannot_leave_the_directory(self):
+        url = reverse('profile_report', args=['..%2Fsettings.prof'])
+        self.assertEqual(self.client.get(url, {'profile': 's3cret'}).status_code, 404)
+
+    @override_settings(PROFILE_SAMPLE_EVERY=2)
+    def test_samples_every_nth_survey_form_post(self):
+        client = type(self.client)()
+        data = {**VALID_ROW, 'river_mile': '-1'}
+        with mock.patch('builtins.print'):
+            responses = [client.post(reverse('survey_form'), data) for _ in range(4)]
+        client.get(reverse('survey_form'))
+        self.assertEqual(['X-Profile' in response for response in responses], [False, True, False, True])
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    @override_settings(PROFILE_TOKEN='', PROFILE_SAMPLE_EVERY=0)
+    def test_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
+
+
+@override_settings(SLOW_QUERY_LOG=True, SLOW_QUERY_MS=0, SLOW_QUERY_EXPLAIN=True)
+class SlowQueryTests(TestCase):
+
+    def setUp(self):
+        slow_queries.install(None, connection)
+        self.addCleanup(connection.execute_wrappers.remove, slow_queries.wrapper)
+        slow_queries.reset()
+
+    def test_fingerprints_normalize_literals_and_lists(self):
+        fingerprint = slow_queries.fingerprint
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "t1" WHERE "x" IN (%s, %s, %s) AND y = \'it\'\'s\'  LIMIT 21'),
+            'SELECT "id" FROM "t1" WHERE "x" IN (...) AND y = ? LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)'),
+            fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)'),
+        )
+        self.assertEqual(fingerprint('RELEASE SAVEPOINT "s1402_x143"'), 'RELEASE SAVEPOINT ?')
+
+    def test_slow_queries_are_logged_with_call_site_and_plan(self):
+        with self.assertLogs('cqhei_app.slow_queries', 'WARNING') as logs:
+            make_survey().save()
+            self.client.get(reverse('survey_list'), {'river_code': 'R01'})
+
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        survey_query = next(
+            entry for entry in entries
+            if entry['sql'].startswith('SELECT') and 'cqhei_app_cqheisurvey' in entry['sql']
+        )
+        self.assertIn('R01', survey_query['params'])
+        self.assertTrue(survey_query['call_site'].startswith('cqhei_app/'))
+        self.assertTrue(survey_query['plan'])
+        self.assertTrue(any('SEARCH' in line or 'SCAN' in line for line in survey_query['plan']))
+
+    def test_counts_are_aggregated_per_fingerprint(self):
+        with self.assertLogs('cqhei_app.slow_queries', 'WARNING'):
+            for code in ['R01', 'R02', 'R03']:
+                self.client.get(reverse('survey_list'), {'river_code': code})
+
+        counts = [entry['count'] for entry in slow_queries.stats() if 'cqhei_app_cqheisurvey' in entry['fingerprint']]
+        self.assertEqual(counts, [3])
+
+    def test_wrapper_is_installed_once_and_outermost(self):
+        with connection.execute_wrapper(lambda *args: args[0](*args[1:])):
+            slow_queries.install(None, connection)
+        self.assertIs(connection.execute_wrappers[0], slow_queries.wrapper)
+        self.assertEqual(connection.execute_wrappers.count(slow_queries.wrapper), 1)
+
+
+def budget_upload():
+    content = json.dumps([VALID_ROW, {**VALID_ROW, 'river_mile': '13.0'}]).encode()
+    return {'file': SimpleUploadedFile('surveys.json', content, content_type='application/json')}
+
+
+# url name -> requests as (method, reverse() args, data factory)
+BUDGET_REQUESTS = {
+    'survey_form': [('GET', [], None), ('POST', [], lambda: dict(VALID_ROW))],
+    'survey_success': [('GET', [1], None)],
+    'survey_list': [('GET', [], None), ('GET', [], lambda: {'river_code': 'R01'})],
+    'export_surveys': [('GET', [], None)],
+    'import_surveys': [('POST', [], budget_upload)],
+    'site_series': [('GET', ['R01', 'Mill Creek at Route 9'], None)],
+    'metrics': [('GET', [], None)],
+    'profile_report': [('GET', ['missing.prof'], None)],
+}
+
+# survey counts each view is measured at
+BUDGET_SIZES = (10, 1_000, 10_000)
+
+# requests that fetch every matching survey (the export, the series one
+# point per survey at the site) or up to a page of them; every other one
+# has to fetch the same amount however many surveys there are
+GROWS_WITH_ROWS = {'GET export_surveys', 'GET survey_list (filtered)', 'GET site_series'}
+
+# bytes per fetched row, averaged over a request: the list and the export
+# read only the columns they show, not whole CQHEISurvey rows
+ROW_BYTES_BUDGET = {
+    'GET survey_list': 100,
+    'GET survey_list (filtered)': 100,
+    'GET export_surveys': 200,
+    'GET site_series': 100,
+}
+
+
+def row_bytes(row):
+    return sum(len(value) if isinstance(value, (str, bytes)) else 8 for value in row if value is not None)
+
+
+@contextlib.contextmanager
+def capture_fetched(fetched):
+    """Add the rows and bytes fetched through any Django cursor to ``fetched``."""
+    def wrap(name, rows_of):
+        def fetch(self, *args):
+            with self.db.wrap_database_errors:
+                result = getattr(self.cursor, name)(*args)
+            for row in rows_of(result):
+                fetched['rows'] += 1
+                fetched['bytes'] += row_bytes(row)
+            return result
+        return fetch
+
+    with contextlib.ExitStack() as stack:
+        for name, rows_of in [
+            ('fetchone', lambda row: [] if row is None else [row]),
+            ('fetchmany', list),
+            ('fetchall', list),
+        ]:
+            stack.enter_context(mock.patch.object(CursorWrapper, name, wrap(name, rows_of), create=True))
+        yield fetched
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query counts for every cqhei_app URL must not depend on how many
+    surveys there are: an N+1 (say, a Cover lookup per listed survey)
+    fails with a diff of the statements added at the larger size.
+    """
+
+    def test_every_url_has_a_budget(self):
+        self.assertEqual({pattern.name for pattern in urls.urlpatterns}, set(BUDGET_REQUESTS))
+
+    def measure(self):
+        """``{label: (queries, {'rows': ..., 'bytes': ...} fetched)}`` for every BUDGET_REQUESTS entry."""
+        measured = {}
+        with mock.patch('builtins.print'):
+            for name, requests in BUDGET_REQUESTS.items():
+                for method, args, data in requests:
+                    label = f'{method} {name}' + (' (filtered)' if method == 'GET' and data else '')
+                    for alias in caches:
+                        caches[alias].clear()
+                    with CaptureQueriesContext(connection) as captured, \
+                            capture_fetched({'rows': 0, 'bytes': 0}) as fetched:
+                        send = self.client.post if method == 'POST' else self.client.get
+                        response = send(reverse(name, args=args), data() if data else None)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    self.assertLess(response.status_code, 500, label)
+                    measured[label] = ([query['sql'] for query in captured], fetched)
+        return measured
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        make_survey().save()
+        # first writes to a site insert its SiteSummary row, later ones update it
+        self.measure()
+        results = {}
+        for size in BUDGET_SIZES:
+            write_surveys(size - CQHEISurvey.objects.count(), seed=size)
+            results[size] = self.measure()
+
+        smallest, *larger = BUDGET_SIZES
+        for size in larger:
+            for label, (queries, _) in results[size].items():
+                expected = results[smallest][label][0]
+                if len(queries) != len(expected):
+                    diff = difflib.unified_diff(
+                        [slow_queries.fingerprint(sql) for sql in expected],
+                        [slow_queries.fingerprint(sql) for sql in queries],
+                        f'{smallest} surveys', f'{size} surveys', lineterm='',
+                    )
+                    self.fail(
+                        f'{label}: {len(expected)} queries with {smallest} surveys, '
+                        f'{len(queries)} with {size}\n' + '\n'.join(diff)
+                    )
+
+        # bytes fetched from the database: from the first size with a full
+        # page on, the same; and per row, only the columns a view uses
+        for label, (_, fetched) in results[BUDGET_SIZES[-1]].items():
+            if label not in GROWS_WITH_ROWS:
+                self.assertLessEqual(fetched['bytes'], results[BUDGET_SIZES[1]][label][1]['bytes'] * 1.1, label)
+            if label in ROW_BYTES_BUDGET:
+                self.assertLessEqual(fetched['bytes'] / fetched['rows'], ROW_BYTES_BUDGET[label], label)
+
+
+class CoverScoreJoinTests(TestCase):
+
+    def test_cover_row_wins_over_the_stored_score(self):
+        covered = make_survey(cover_score=0)
+        covered.save()
+        insert_cover(covered.id, {'cover_boulders': True, 'cover_deep_areas': True})
+        uncovered = make_survey(cover_score=6)
+        uncovered.save()
+
+        scores = dict(with_cover_scores(CQHEISurvey.objects.all()).values_list('id', 'section2_score'))
+        self.assertEqual(scores, {covered.id: 4, uncovered.id: 6})
+
+    def test_list_and_export_read_scores_in_one_query(self):
+        write_surveys(500, seed=3)
+        expected = cover_scores()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('survey_list'))
+        surveys = response.context['surveys']
+        self.assertEqual({row['id']: row['section2_score'] for row in surveys},
+                         {row['id']: expected[row['id']] for row in surveys})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('export_surveys'))
+            rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        header, *rows = rows
+        self.assertEqual(len(rows), 500)
+        column = header.index('cover_score')
+        self.assertEqual({int(row[0]): int(row[column]) for row in rows}, expected)
@@ -0,0 +1,140 @@
+"""
+Per-request timing: wall time, database time and query count, and
+template render time, sent back in a ``Server-Timing`` header::
+
+    Server-Timing: total;dur=41.2, db;dur=30.5;desc="2 queries", tpl;dur=6.1, app;dur=4.6
+
+``app`` is what is left: form validation, scoring and the view itself.
+Requests slower than ``REQUEST_TIMING_SLOW_MS`` are also logged as one
+JSON line on the ``cqhei_app.timing`` logger, ``REQUEST_TIMING_LOG_SAMPLE``
+of them (a fraction; 1.0 logs every one).
+
+Everything is off unless ``REQUEST_TIMING`` is set (see settings.py). The
+middleware then raises MiddlewareNotUsed, so Django drops it from the
+chain, and settings.py keeps the stock template backend: a request pays
+nothing for the feature being available.
+
+A streaming response (the CSV export) is timed up to the point its body
+starts; queries it runs while streaming are not counted.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# the RequestTimer of the request being handled, if timing is on
+current = contextvars.ContextVar('cqhei_request_timer', default=None)
+
+
+class RequestTimer:
+    __slots__ = ('started', 'db', 'queries', 'template', 'template_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        """Return the request's timings in milliseconds."""
+        total = (time.perf_counter() - self.started) * 1000
+        db = self.db * 1000
+        template = self.template * 1000
+        return {
+            'total_ms': round(total, 3),
+            'db_ms': round(db, 3),
+            'queries': self.queries,
+            'template_ms': round(template, 3),
+            'app_ms': round(max(total - db - template, 0.0), 3),
+        }
+
+
+def server_timing(timings):
+    return (
+        f"total;dur={timings['total_ms']:.1f}, "
+        f"db;dur={timings['db_ms']:.1f};desc=\"{timings['queries']} queries\", "
+        f"tpl;dur={timings['template_ms']:.1f}, "
+        f"app;dur={timings['app_ms']:.1f}"
+    )
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        timer = current.get()
+        if timer is None:
+            return super().render(context, request)
+        # only the outermost render counts, so nested renders are not summed twice
+        timer.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timer.template_depth -= 1
+            if not timer.template_depth:
+                timer.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, adding render time to the current RequestTimer."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class RequestTimingMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 500)
+        self.log_sample = getattr(settings, 'REQUEST_TIMING_LOG_SAMPLE', 1.0)
+
+    def __call__(self, request):
+        timer = RequestTimer()
+        token = current.set(timer)
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+
+        timings = timer.finish()
+        response['Server-Timing'] = server_timing(timings)
+        if timings['total_ms'] >= self.slow_ms and random.random() < self.log_sample:
+            match = getattr(request, 'resolver_match', None)
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'route': match.url_name if match else None,
+                'status': response.status_code,
+                **timings,
+            }))
+        return response
@@ -4,5 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.survey_form, name='survey_form'),
     path('success/<int:survey_id>/', views.survey_success, name='survey_success'),
+    path('surveys/', views.survey_list, name='survey_list'),
+    path('export/', views.export_surveys_csv, name='export_surveys'),
+    path('import/', views.import_surveys, name='import_surveys'),
+    path('series/<str:river_code>/<path:river_site>/', views.site_series, name='site_series'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/<str:name>/', views.profile_report, name='profile_report'),
     # path('results/', views.survey_results, name='survey_results'),  # Remove this for now
 ]
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+CQHEISurveyForm's rules, compiled once for the API and bulk paths.
+
+Building a form per row deep-copies ~80 fields and binds a widget to each;
+here the form's own field objects are reused, so every value is cleaned
+by exactly the code the HTML form runs, and the cross-field rules are
+precomputed as column indexes into the checkbox matrix:
+
+* ``validate_row(raw)`` checks one plain dict;
+* ``validate_batch(columns, matrix)`` checks a whole batch, cleaning each
+  distinct text value once and applying the checkbox rules with NumPy.
+
+Both return the same error messages, keyed the same way, as the form.
+"""
+import numpy as np
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .forms import (
+    OTHER_LENGTH_FORM_ERROR, SINGLE_CHOICE_SECTIONS, CQHEISurveyForm, river_mile_errors, survey_date_errors,
+)
+from .models import OTHER_LENGTH_MODEL_ERROR
+from .rubric import SCORE_FIELDS
+from .scoring import FIELD_INDEX
+
+# The editable, non-checkbox columns a row may carry
+INPUT_FIELDS = [
+    'survey_date', 'river_code', 'river_mile', 'clarity', 'forest_ule_number',
+    'cluster_number', 'river_site', 'name_group', 'reach_length', 'reach_length_custom',
+]
+
+# The form's own field instances; cleaning a value is a plain method call
+FORM_FIELDS = {name: CQHEISurveyForm.base_fields[name] for name in INPUT_FIELDS}
+
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'x', 'on', 'checked'}
+
+# SINGLE_CHOICE_SECTIONS as checkbox-matrix columns, in the form's order
+SINGLE_CHOICE_COLUMNS = [
+    np.array([FIELD_INDEX[field] for field in section['fields']], dtype=np.intp)
+    for section in SINGLE_CHOICE_SECTIONS
+]
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _field_rules(today):
+    """
+    The rules behind the form's ``clean_<field>`` methods, which only run
+    once the field itself has cleaned without errors; ``today`` is fixed
+    for the whole batch.
+    """
+    return {
+        'river_mile': river_mile_errors,
+        'survey_date': lambda value: survey_date_errors(value, today),
+    }
+
+
+def _clean_value(name, value, rules):
+    """Return ``(cleaned, messages)`` for one raw value of field ``name``."""
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        cleaned = FORM_FIELDS[name].clean(value)
+    except ValidationError as e:
+        return None, e.messages
+    rule = rules.get(name)
+    return cleaned, (rule(cleaned) if rule else None)
+
+
+def validate_row(raw):
+    """
+    Apply CQHEISurveyForm's rules to one raw row.
+
+    Returns ``(data, errors)``: ``data`` holds the cleaned values ready for
+    CQHEISurvey(**data), ``errors`` maps field names (or ``'__all__'``) to
+    lists of the same messages the form would show.
+    """
+    rules = _field_rules(timezone.now().date())
+    data = {}
+    errors = {}
+
+    for name in INPUT_FIELDS:
+        data[name], messages = _clean_value(name, raw.get(name), rules)
+        if messages:
+            errors[name] = messages
+
+    for name in SCORE_FIELDS:
+        data[name] = parse_bool(raw.get(name))
+
+    # clean(): the first over-ticked single-choice group stops validation
+    for section in SINGLE_CHOICE_SECTIONS:
+        if sum(1 for field in section['fields'] if data[field]) > 1:
+            errors['__all__'] = [section['error']]
+            break
+    else:
+        reach_length = data.get('reach_length')
+        if reach_length and str(reach_length).lower() == 'other':
+            if not data.get('reach_length_custom'):
+                errors.setdefault('reach_length_custom', []).append(OTHER_LENGTH_FORM_ERROR)
+
+    # CQHEISurvey.clean(), which the ModelForm runs after clean()
+    if data.get('reach_length') == 'other':
+        if not data.get('reach_length_custom'):
+            errors.setdefault('reach_length_custom', []).append(OTHER_LENGTH_MODEL_ERROR)
+    else:
+        data['reach_length_custom'] = ''
+
+    return data, errors
+
+
+def checkbox_matrix(columns, n):
+    """
+    Build the (n, len(SCORE_FIELDS)) boolean matrix from raw checkbox
+    ``columns``; a missing column is all False.
+    """
+    matrix = np.zeros((n, len(SCORE_FIELDS)), dtype=bool)
+    for name, i in FIELD_INDEX.items():
+        values = columns.get(name)
+        if values is None:
+            continue
+        values = np.asarray(values)
+        if values.dtype == bool:
+            matrix[:, i] = values
+        else:
+            matrix[:, i] = [parse_bool(value) for value in values.tolist()]
+    return matrix
+
+
+def validate_batch(columns, matrix=None):
+    """
+    Apply CQHEISurveyForm's rules to a batch of rows given as columns.
+
+    ``columns`` maps INPUT_FIELDS names to equal-length sequences of raw
+    values. Checkboxes are either a boolean ``matrix`` with SCORE_FIELDS
+    columns or, when it is None, more entries of ``columns``.
+
+    Returns ``(data, matrix, errors)``: ``data`` maps INPUT_FIELDS to lists
+    of cleaned values (None where invalid), ``matrix`` is the checkbox
+    matrix and ``errors`` is one validate_row-style dict per row.
+    """
+    n = len(matrix) if matrix is not None else max((len(v) for v in columns.values()), default=0)
+    if matrix is None:
+        matrix = checkbox_matrix(columns, n)
+    rules = _field_rules(timezone.now().date())
+    errors = [{} for _ in range(n)]
+    data = {}
+
+    for name in INPUT_FIELDS:
+        values = columns.get(name)
+        if values is None:
+            values = [None] * n
+        elif isinstance(values, np.ndarray):
+            values = values.tolist()
+        # batches repeat dates, river codes and crew names: clean each once
+        seen = {}
+        cleaned = []
+        for i, value in enumerate(values):
+            key = (type(value), value)
+            try:
+                result = seen.get(key)
+            except TypeError:  # unhashable, e.g. a list from JSON
+                result = _clean_value(name, value, rules)
+            if result is None:
+                result = seen[key] = _clean_value(name, value, rules)
+            cleaned.append(result[0])
+            if result[1]:
+                errors[i][name] = list(result[1])
+        data[name] = cleaned
+
+    # clean(): the first over-ticked single-choice group per row
+    first = np.full(n, -1)
+    for g, cols in enumerate(SINGLE_CHOICE_COLUMNS):
+        over = (matrix[:, cols].sum(axis=1) > 1) & (first < 0)
+        first[over] = g
+    for i in np.flatnonzero(first >= 0).tolist():
+        errors[i]['__all__'] = [SINGLE_CHOICE_SECTIONS[first[i]]['error']]
+
+    reach_length = np.array(data['reach_length'], dtype=object)
+    is_other = reach_length == 'other'
+    no_custom = np.array([not value for value in data['reach_length_custom']], dtype=bool)
+    for i in np.flatnonzero(is_other & no_custom).tolist():
+        messages = errors[i].setdefault('reach_length_custom', [])
+        if first[i] < 0:
+            messages.append(OTHER_LENGTH_FORM_ERROR)
+        messages.append(OTHER_LENGTH_MODEL_ERROR)
+    for i in np.flatnonzero(~is_other).tolist():
+        data['reach_length_custom'][i] = ''
+
+    return data, matrix, errors
@@ -1 +1 @@
-from django.shortcuts import render, redirectfrom django.http import HttpResponsefrom django.utils import timezonefrom django.db import connectionfrom .forms import CQHEISurveyForm# NOTE: CQHEISurvey intentionally NOT used hereimport csv# helper to normalize checkbox → scoredef score(val):    return 2 if val else 0def survey_form(request):    if request.method == 'POST':        print("🔥🔥🔥 SURVEY POST HIT UPDATED DJANGO CODE 🔥🔥🔥")        form = CQHEISurveyForm(request.POST)        if form.is_valid():            # ============================            # Section II – Fish Cover ONLY            # ============================            now = timezone.now()            # TEMP: isolate Section II only            # We are NOT saving survey data yet            survey_id = int(timezone.now().timestamp())            with connection.cursor() as cursor:                cursor.execute(                    """                    INSERT INTO cQHEI.Cover (                        cQHEI_New_X_ID,                        Underwater_Tree_Roots,                        Underwater_Tree_Rootlets,                        Boulders,                        Oxbows_Backwaters,                        Downed_trees,                        Shallows,                        Water_Plants,                        Deep_Pools,                        Overhanging_Vegetation,                        Undercut_Banks,                        Created_Timestamp,                        Last_Updated_Timestamp                    )                    OUTPUT INSERTED.Cover_Score                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)                    """,                    [                        survey_id,                        score(form.cleaned_data.get('cover_underwater_tree_roots_large')),                        score(form.cleaned_data.get('cover_underwater_tree_rootlets')),                        score(form.cleaned_data.get('cover_boulders')),                        score(form.cleaned_data.get('cover_backwaters')),                        score(form.cleaned_data.get('cover_downed_trees')),                        score(form.cleaned_data.get('cover_shallow_slow_areas')),                        score(form.cleaned_data.get('cover_water_plants')),                        score(form.cleaned_data.get('cover_deep_areas')),                        score(form.cleaned_data.get('cover_shrubs_small_trees')),                        score(form.cleaned_data.get('cover_undercut_banks')),                        now,                        now                    ]                )                section2_score = cursor.fetchone()[0]            print(f"🔥 COVER SCORE RETURNED FROM SQL = {section2_score}")            # TEMP success redirect (no survey object)            return render(                request,                'success.html',                {                    'cover_score': section2_score                }            )        else:            print("❌ FORM INVALID")            print(form.errors)    else:        form = CQHEISurveyForm()    return render(        request,        'survey_form.html',        {            'form': form        }    )# BELOW VIEWS ARE LEFT UNCHANGED# They are NOT used in Section II isolation modedef survey_success(request, survey_id):    return HttpResponse("Survey integration not enabled yet.")def survey_list(request):    return HttpResponse("Survey list not enabled yet.")def export_surveys_csv(request):    response = HttpResponse(content_type='text/csv')    response['Content-Disposition'] = 'attachment; filename="cqhei_surveys.csv"'    writer = csv.writer(response)    writer.writerow(['Cover_Score'])    return response
\ No newline at end of file
+from django.conf import settingsfrom django.shortcuts import render, redirectfrom django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponsefrom django.utils import timezonefrom django.utils.crypto import constant_time_comparefrom django.utils.dateparse import parse_datefrom django.db.models import Qfrom django.views.decorators.http import require_GET, require_POSTfrom .covers import insert_cover, with_cover_scoresfrom .forms import CQHEISurveyFormfrom .importer import ImportFormatError, check_readable, import_rows, read_rowsfrom .metrics import latest as latest_metricsfrom . import profilingfrom .models import CQHEISurveyfrom .rubric import FLAG_FIELDS, SCORE_FIELDS, unpack_sectionsfrom .series import series_jsonimport csvimport functoolsimport iodef survey_form(request):    if request.method == 'POST':        print("🔥🔥🔥 SURVEY POST HIT UPDATED DJANGO CODE 🔥🔥🔥")        form = CQHEISurveyForm(request.POST)        if form.is_valid():            # ============================            # Section II – Fish Cover ONLY            # ============================            # TEMP: isolate Section II only            # We are NOT saving survey data yet            survey_id = int(timezone.now().timestamp())            # one round trip: the INSERT returns the computed Cover_Score            # ...and the key is no CQHEISurvey id, so no site summary to update            cover_id, section2_score = insert_cover(survey_id, form.cleaned_data, has_survey=False)            print(f"🔥 COVER SCORE RETURNED FROM SQL = {section2_score}")            # TEMP success redirect (no survey object)            return render(                request,                'success.html',                {                    'cover_score': section2_score                }            )        else:            print("❌ FORM INVALID")            print(form.errors)    else:        form = CQHEISurveyForm()    return render(        request,        'survey_form.html',        {            'form': form        }    )# BELOW VIEWS ARE LEFT UNCHANGED# They are NOT used in Section II isolation modedef survey_success(request, survey_id):    return HttpResponse("Survey integration not enabled yet.")# ============================# Survey list (keyset pagination)# ============================# only the columns survey_list.html shows; section2_score is the# cQHEI.Cover score, annotated by with_cover_scores()LIST_FIELDS = ['id', 'survey_date', 'river_site', 'river_code', 'river_mile', 'name_group', 'section2_score']LIST_PAGE_SIZE = 50def parse_cursor(value):    """Parse an ``after`` cursor of the form ``<survey_date>.<id>``."""    date_part, _, id_part = (value or '').partition('.')    survey_date = parse_date(date_part) if date_part else None    if survey_date is None or not id_part.isdigit():        return None    return survey_date, int(id_part)def list_queryset(request):    """    The filtered, cursor-positioned survey queryset for a list request,    plus the parsed filters the page echoes back.    """    # Seek pagination on (survey_date, id), newest first: each page is an    # index range scan from the last row of the previous page, so latency    # does not grow with the page number the way OFFSET does.    queryset = CQHEISurvey.objects.order_by('-survey_date', '-id')    river_code = request.GET.get('river_code', '').strip()    if river_code:        queryset = queryset.filter(river_code=river_code)    date_from = parse_date(request.GET.get('date_from', '') or '')    if date_from:        queryset = queryset.filter(survey_date__gte=date_from)    date_to = parse_date(request.GET.get('date_to', '') or '')    if date_to:        queryset = queryset.filter(survey_date__lte=date_to)    cursor = parse_cursor(request.GET.get('after'))    if cursor:        survey_date, survey_id = cursor        # The redundant survey_date__lte gives the planner an index range        # to seek into; the OR alone makes SQLite scan from the top.        queryset = queryset.filter(survey_date__lte=survey_date).filter(            Q(survey_date__lt=survey_date) | Q(id__lt=survey_id)        )    # one extra row tells us whether there is a next page    queryset = with_cover_scores(queryset).values(*LIST_FIELDS)[:LIST_PAGE_SIZE + 1]    filters = {'river_code': river_code, 'date_from': date_from, 'date_to': date_to}    return queryset, filters, cursordef list_page(request, surveys, filters, cursor):    next_query = None    if len(surveys) > LIST_PAGE_SIZE:        surveys = surveys[:LIST_PAGE_SIZE]        last = surveys[-1]        params = request.GET.copy()        params['after'] = f"{last['survey_date'].isoformat()}.{last['id']}"        next_query = params.urlencode()    first_query = None    if cursor:        params = request.GET.copy()        params.pop('after')        first_query = params.urlencode()    return render(        request,        'survey_list.html',        {            'surveys': surveys,            **filters,            'next_query': next_query,            'first_query': first_query,        }    )def survey_list(request):    queryset, filters, cursor = list_queryset(request)    return list_page(request, list(queryset), filters, cursor)# ============================# CSV export# ============================EXPORT_INFO_FIELDS = [    'id', 'survey_date', 'river_code', 'river_mile', 'clarity',    'forest_ule_number', 'cluster_number', 'river_site', 'name_group',    'reach_length', 'reach_length_custom',]EXPORT_FIELDS = [*EXPORT_INFO_FIELDS, *SCORE_FIELDS, 'cover_score']# what EXPORT_FIELDS are read from: the six packed *_flags columns rather# than the ~60 checkbox columns (ExportWriter expands them), and for# cover_score the cQHEI.Cover score, annotated by with_cover_scores()EXPORT_VALUES = [*EXPORT_INFO_FIELDS, *FLAG_FIELDS, 'section2_score']# rows fetched per round trip and written per yielded blockEXPORT_CHUNK_SIZE = 2000@functools.lru_cache(maxsize=4096)def expand_flags(codes):    """The SCORE_FIELDS values packed in one row's ``*_flags`` ``codes``; surveys share few combinations."""    return tuple(unpack_sections(codes).values())class ExportWriter:    """    Write CSV export rows into a small reusable buffer and hand back a    block of text every ``chunk_size`` rows, so memory stays constant    however many surveys are exported. Shared by the sync and async views.    """    def __init__(self, chunk_size=EXPORT_CHUNK_SIZE):        self.chunk_size = chunk_size        self.buffer = io.StringIO()        self.writer = csv.writer(self.buffer)        self.rows = 0        self.writer.writerow(EXPORT_FIELDS)    def write(self, row):        """Add ``row`` of EXPORT_VALUES; return a full block when one is ready, else None."""        n = len(EXPORT_INFO_FIELDS)        self.writer.writerow((*row[:n], *expand_flags(row[n:-1]), row[-1]))        self.rows += 1        if self.rows % self.chunk_size == 0:            return self.flush()        return None    def flush(self):        block = self.buffer.getvalue()        self.buffer.seek(0)        self.buffer.truncate()        return blockdef export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):    """    Yield the CSV export of ``queryset`` in blocks of ``chunk_size`` rows,    read from a chunked server-side iterator.    """    out = ExportWriter(chunk_size)    rows = with_cover_scores(queryset).values_list(*EXPORT_VALUES)    for row in rows.iterator(chunk_size=chunk_size):        block = out.write(row)        if block:            yield block    yield out.flush()def export_surveys_csv(request):    queryset = CQHEISurvey.objects.order_by('id')    response = StreamingHttpResponse(export_rows(queryset), content_type='text/csv')    response['Content-Disposition'] = 'attachment; filename="cqhei_surveys.csv"'    return response# ============================# Bulk import upload# ============================@require_POSTdef import_surveys(request):    upload = request.FILES.get('file')    if upload is None:        return JsonResponse({'error': "Upload a CSV or JSON file as 'file'."}, status=400)    fmt = request.POST.get('format') or ('json' if upload.name.lower().endswith('.json') else 'csv')    try:        with io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='') as f:            # one transaction per batch, so an unreadable file must be            # turned away before the first batch is written            check_readable(f, fmt)            report = import_rows(read_rows(f, fmt))    except ImportFormatError as e:        return JsonResponse({'error': str(e)}, status=400)    return JsonResponse(report)# ============================# Per-site score time series# ============================@require_GETdef site_series(request, river_code, river_site):    # already-encoded JSON straight from the cache on repeat views    return HttpResponse(series_json(river_code, river_site), content_type='application/json')# ============================# Prometheus metrics# ============================@require_GETdef metrics(request):    token = settings.METRICS_TOKEN    if not token and settings.IS_AZURE:        # never public in production        raise Http404    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):        return HttpResponse(status=401)    body, content_type = latest_metrics()    return HttpResponse(body, content_type=content_type)# ============================# Saved request profiles# ============================@require_GETdef profile_report(request, name):    if not profiling.authorized(request):        raise Http404    path = profiling.profile_path(name)    if path is None:        raise Http404    if request.GET.get('download'):        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)    return HttpResponse(profiling.report(path), content_type='text/plain')
\ No newline at end of file
@@ -2,6 +2,9 @@
 ASGI config for cqhei_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the list, export and time-series routes are served by the async
+views in cqhei_app/async_views.py (see settings_asgi.py); run it with
+``gunicorn -c gunicorn_asgi.conf.py cqhei_project.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cqhei_project.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cqhei_project.settings_asgi')
 
 application = get_asgi_application()
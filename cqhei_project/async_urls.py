@@ -0,0 +1,11 @@
+"""
+ROOT_URLCONF under ASGI (see settings_asgi.py): the same routes as urls.py,
+with cqhei_app's I/O-bound views served by their async versions.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('cqhei_app.async_urls')),
+]
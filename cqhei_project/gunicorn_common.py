@@ -0,0 +1,44 @@
+"""
+What gunicorn.conf.py and gunicorn_asgi.conf.py share: the metrics
+directory both worker models write to, and the server hooks.
+
+Imported by the config files only, before Django is set up; the hooks
+import Django and prometheus_client themselves.
+"""
+import os
+import shutil
+import tempfile
+
+
+def prepare_metrics_dir(bind):
+    """
+    Point PROMETHEUS_MULTIPROC_DIR at a temp directory per bind port unless
+    it is set, and empty it on the master's first load. Returns its path.
+    """
+    # each worker writes its metrics here; /metrics sums them (cqhei_app/metrics.py).
+    # Emptied and created now, before a preloaded app can open files in it, and
+    # only on the master's first load: a HUP reload re-reads the config while
+    # the old workers still write there.
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), f"cqhei-metrics-{bind.rsplit(':', 1)[-1]}"),
+    )
+    if os.environ.get("CQHEIMETRICSDIRREADY") != metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.environ["CQHEIMETRICSDIRREADY"] = metrics_dir
+    os.makedirs(metrics_dir, exist_ok=True)
+    return metrics_dir
+
+
+def post_fork(server, worker):
+    # a connection opened while preloading must not be shared across forks
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -43,6 +44,10 @@ INSTALLED_APPS = [
 # ------------------------------------------------------------------------------
 
 MIDDLEWARE = [
+    # outermost, so its wall time covers the rest of the stack
+    "cqhei_app.timing.RequestTimingMiddleware",
+    "cqhei_app.metrics.MetricsMiddleware",
+    "cqhei_app.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -63,7 +68,6 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.debug",
@@ -71,18 +75,111 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # Compile each template once per process (replaces APP_DIRS)
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                ),
+            ],
         },
     },
 ]
 
+# ------------------------------------------------------------------------------
+# REQUEST TIMING (see cqhei_app/timing.py)
+# ------------------------------------------------------------------------------
+
+# Server-Timing header with wall, DB and template time on every response.
+# When off the middleware removes itself and templates render untimed.
+REQUEST_TIMING = os.getenv("REQUESTTIMING", "False").lower() == "true"
+# Requests at least this slow are logged as JSON on cqhei_app.timing...
+REQUEST_TIMING_SLOW_MS = float(os.getenv("REQUESTTIMINGSLOWMS", "500"))
+# ...this fraction of them
+REQUEST_TIMING_LOG_SAMPLE = float(os.getenv("REQUESTTIMINGLOGSAMPLE", "1.0"))
+
+if REQUEST_TIMING:
+    TEMPLATES[0]["BACKEND"] = "cqhei_app.timing.TimedDjangoTemplates"
+
+# ------------------------------------------------------------------------------
+# METRICS (see cqhei_app/metrics.py)
+# ------------------------------------------------------------------------------
+
+# Prometheus request, query and scoring metrics, served at /metrics/
+METRICS = os.getenv("METRICS", "True").lower() == "true"
+# When set, /metrics/ requires "Authorization: Bearer <token>"; on Azure
+# (IS_AZURE below) it is not served at all without one
+METRICS_TOKEN = os.getenv("METRICSTOKEN", "")
+
+# ------------------------------------------------------------------------------
+# PROFILING (see cqhei_app/profiling.py)
+# ------------------------------------------------------------------------------
+
+# Requests sending this as "X-Profile: <token>" or "?profile=<token>" are
+# profiled with cProfile and link to the report in an X-Profile header
+PROFILE_TOKEN = os.getenv("PROFILETOKEN", "")
+# Also profile every Nth survey form POST per worker (0: never)
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILESAMPLEEVERY", "0"))
+# Where profiles are written; only the newest PROFILE_KEEP are kept
+PROFILE_DIR = os.getenv("PROFILEDIR", os.path.join(tempfile.gettempdir(), "cqhei-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILEKEEP", "100"))
+
+# ------------------------------------------------------------------------------
+# SLOW QUERIES (see cqhei_app/slow_queries.py)
+# ------------------------------------------------------------------------------
+
+# Time every query and count it by fingerprint...
+SLOW_QUERY_LOG = os.getenv("SLOWQUERYLOG", "False").lower() == "true"
+# ...and log those at least this slow as JSON on cqhei_app.slow_queries...
+SLOW_QUERY_MS = float(os.getenv("SLOWQUERYMS", "100"))
+# ...with the database's plan for them
+SLOW_QUERY_EXPLAIN = os.getenv("SLOWQUERYEXPLAIN", "True").lower() == "true"
+
 WSGI_APPLICATION = "cqhei_project.wsgi.application"
 
+# ------------------------------------------------------------------------------
+# CACHES
+# ------------------------------------------------------------------------------
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cqhei-default",
+    },
+    # Site score time series (cqhei_app/series.py). In the database, so all
+    # workers and management commands see one copy and one version per
+    # site; a per-process cache would go on serving series another process
+    # has invalidated. The table is created by migration 0013.
+    "series": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cqhei_cache",
+    },
+    # Rendered template fragments. Kept per process so a deploy (which
+    # restarts the workers) never serves markup from the old templates.
+    "fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "cqhei-fragments",
+        "TIMEOUT": None,
+    },
+}
+
 # ------------------------------------------------------------------------------
 # DATABASE CONFIGURATION (FIXED)
 # ------------------------------------------------------------------------------
 
 RUNNING_COLLECTSTATIC = "collectstatic" in sys.argv
 
+# Persistent connections: each worker thread keeps its connection for up to
+# DBCONNMAXAGE seconds (0 closes it after every request, as Django's default
+# does) and checks it is still usable before reusing it for a new request.
+# Opening an encrypted Azure SQL connection costs several round trips, so
+# reuse is most of the submit latency.
+CONN_MAX_AGE = int(os.getenv("DBCONNMAXAGE", "600"))
+CONN_HEALTH_CHECKS = os.getenv("DBCONNHEALTHCHECKS", "True").lower() == "true"
+
 DB_ENV_READY = all([
     os.getenv("DBNAME"),
     os.getenv("DBUSER"),
@@ -109,23 +206,27 @@ elif "WEBSITE_HOSTNAME" in os.environ and DB_ENV_READY:
             "PASSWORD": os.getenv("DBPASSWORD"),
             "HOST": os.getenv("DBHOST"),
             "PORT": os.getenv("DBPORT", "1433"),
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": CONN_HEALTH_CHECKS,
             "OPTIONS": {
                 "driver": "ODBC Driver 17 for SQL Server",
                 "extra_params": (
                     "Encrypt=yes;"
                     "TrustServerCertificate=no;"
-                    "Connection Timeout=30;"
+                    f"Connection Timeout={os.getenv('DBCONNECTTIMEOUT', '30')};"
                 ),
             },
         }
     }
 
 else:
-    # Local development fallback
+    # Local development fallback (SQLITE_PATH lets benchmarks use a scratch DB)
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
-            "NAME": BASE_DIR / "db.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+            "CONN_MAX_AGE": CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": CONN_HEALTH_CHECKS,
         }
     }
 
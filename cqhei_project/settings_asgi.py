@@ -0,0 +1,16 @@
+"""
+Settings for the ASGI entry point: everything from settings.py, routed
+through the async views.
+
+Connections are closed at the end of every request. Django runs each
+async request's database work in a fresh thread-sensitive context, so a
+connection kept for CONN_MAX_AGE is never picked up by a later request
+and never closed: one would leak per request until Azure SQL runs out.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+ROOT_URLCONF = "cqhei_project.async_urls"
+
+CONN_MAX_AGE = 0
+DATABASES = {alias: {**database, "CONN_MAX_AGE": 0} for alias, database in DATABASES.items()}
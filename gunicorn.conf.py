@@ -1,2 +1,40 @@
-bind = "0.0.0.0:8000" 
-workers = 2 
+"""
+Gunicorn settings, sized from the CPU count unless overridden by env vars:
+
+    GUNICORNWORKERCLASS  "sync" (default) or "gthread"
+    GUNICORNWORKERS      worker processes (sync: 2 * CPUs + 1, gthread: CPUs)
+    GUNICORNTHREADS      threads per gthread worker (default 4)
+    GUNICORNPRELOAD      "true" imports the app once in the master before
+                         forking, so workers share its memory and start faster
+    GUNICORNTIMEOUT      seconds before a silent worker is restarted (default 120)
+    PROMETHEUS_MULTIPROC_DIR
+                         where workers keep /metrics values (default: a
+                         temp directory per port, emptied on start)
+
+With gthread a slow Azure SQL call or a long CSV export holds one thread,
+not a whole worker. Each thread keeps its own persistent database
+connection (CONN_MAX_AGE), so workers * threads is also the number of
+connections the app may hold open.
+"""
+import multiprocessing
+import os
+
+from cqhei_project.gunicorn_common import child_exit, post_fork, prepare_metrics_dir
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.getenv("GUNICORNBIND", "0.0.0.0:8000")
+
+worker_class = os.getenv("GUNICORNWORKERCLASS", "sync")
+if worker_class == "gthread":
+    workers = int(os.getenv("GUNICORNWORKERS", cpus))
+    threads = int(os.getenv("GUNICORNTHREADS", "4"))
+else:
+    workers = int(os.getenv("GUNICORNWORKERS", 2 * cpus + 1))
+
+preload_app = os.getenv("GUNICORNPRELOAD", "False").lower() == "true"
+timeout = int(os.getenv("GUNICORNTIMEOUT", "120"))
+
+# where every worker keeps its /metrics values; post_fork and child_exit,
+# imported above, are the server hooks both configs share
+metrics_dir = prepare_metrics_dir(bind)
@@ -0,0 +1,40 @@
+"""
+Gunicorn settings for the ASGI app (cqhei_project.asgi:application) on
+uvicorn workers:
+
+    gunicorn -c gunicorn_asgi.conf.py cqhei_project.asgi:application
+
+Each worker runs an event loop, so one process holds many concurrent slow
+downloads and database waits; one worker per CPU is enough.
+
+Unlike the WSGI workers these do not keep database connections between
+requests: every async request gets its own connection, which a later
+request never reuses, so settings_asgi.py sets CONN_MAX_AGE = 0 and
+DBCONNMAXAGE has no effect here. The same env vars as gunicorn.conf.py
+apply otherwise:
+
+    GUNICORNWORKERS      worker processes (default: CPUs)
+    GUNICORNPRELOAD      "true" imports the app once before forking
+    GUNICORNTIMEOUT      seconds before a silent worker is restarted (default 120)
+    PROMETHEUS_MULTIPROC_DIR
+                         where workers keep /metrics values (default: a
+                         temp directory per port, emptied on start)
+"""
+import multiprocessing
+import os
+
+from cqhei_project.gunicorn_common import child_exit, post_fork, prepare_metrics_dir
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.getenv("GUNICORNBIND", "0.0.0.0:8000")
+
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("GUNICORNWORKERS", cpus))
+
+preload_app = os.getenv("GUNICORNPRELOAD", "False").lower() == "true"
+timeout = int(os.getenv("GUNICORNTIMEOUT", "120"))
+
+# where every worker keeps its /metrics values; post_fork and child_exit,
+# imported above, are the server hooks both configs share
+metrics_dir = prepare_metrics_dir(bind)